@@ -2,10 +2,11 @@
 
 import sqlite3
 import argparse
-from pathlib import Path
+import sys
+from typing import Optional, TextIO
 
 
-def analyze(conn: sqlite3.Connection, args: argparse.Namespace):
+def analyze(conn: sqlite3.Connection, args: argparse.Namespace, file: Optional[TextIO] = None):
     """
     Run analytics queries with optional filters.
 
@@ -16,18 +17,16 @@ def analyze(conn: sqlite3.Connection, args: argparse.Namespace):
     Args:
         conn: SQLite database connection
         args: Parsed command-line arguments
+        file: Stream for the printed output (default: sys.stdout)
     """
-    # Register DIRNAME function
-    conn.create_function("DIRNAME", 1,
-        lambda p: str(Path(p).parent) if p else None)
-
+    file = file or sys.stdout
     if args.folders:
-        _analyze_folders(conn, args)
+        _analyze_folders(conn, args, file)
     else:
-        print("\nNo analysis type specified. Use --folders.\n")
+        print("\nNo analysis type specified. Use --folders.\n", file=file)
 
 
-def _analyze_folders(conn: sqlite3.Connection, args: argparse.Namespace):
+def _analyze_folders(conn: sqlite3.Connection, args: argparse.Namespace, file: TextIO):
     """Analyze track counts by folder path."""
     conditions = []
     params = []
@@ -59,7 +58,7 @@ def _analyze_folders(conn: sqlite3.Connection, args: argparse.Namespace):
         conditions.append("bpm <= ?")
         params.append(args.bpm_max)
 
-    where_clause = " AND ".join(conditions) if conditions else "1=1"
+    where_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
 
     # Query folder breakdown
     sql = f"""
@@ -67,7 +66,7 @@ def _analyze_folders(conn: sqlite3.Connection, args: argparse.Namespace):
             DIRNAME(filepath) as folder_path,
             COUNT(*) as track_count
         FROM tracks
-        WHERE {where_clause}
+        {where_clause}
         GROUP BY DIRNAME(filepath)
         ORDER BY track_count DESC
         LIMIT ?
@@ -79,7 +78,7 @@ def _analyze_folders(conn: sqlite3.Connection, args: argparse.Namespace):
     rows = cursor.fetchall()
 
     if not rows:
-        print("\nNo folders found matching criteria.\n")
+        print("\nNo folders found matching criteria.\n", file=file)
         return
 
     # Find max width for alignment
@@ -111,9 +110,9 @@ def _analyze_folders(conn: sqlite3.Connection, args: argparse.Namespace):
     if filter_str:
         title += f" [{filter_str}]"
 
-    print(f"\n{title}:\n")
+    print(f"\n{title}:\n", file=file)
     for path, count in rows:
         path_display = path or "(no path)"
-        print(f"   {path_display.ljust(max_path_len)}  {count} track{'s' if count != 1 else ''}")
+        print(f"   {path_display.ljust(max_path_len)}  {count} track{'s' if count != 1 else ''}", file=file)
 
-    print()
+    print(file=file)
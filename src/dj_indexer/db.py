@@ -1,5 +1,7 @@
 """Database connection, schema, and utilities."""
 
+import functools
+import re
 import sqlite3
 from pathlib import Path
 
@@ -24,19 +26,29 @@ def safe_float(value):
         return None
 
 
-def get_db(db_path: Path) -> sqlite3.Connection:
+def get_db(db_path: Path | str) -> sqlite3.Connection:
     """
     Open or create SQLite database with schema.
 
-    Enables WAL mode and foreign keys.
+    Enables WAL mode (synchronous=NORMAL) and foreign keys, and registers the REGEXP/DIRNAME helpers.
     Creates schema if database is new.
+    Pass ":memory:" for a throwaway in-memory database (WAL is ignored there).
     """
     conn = sqlite3.connect(str(db_path))
     conn.row_factory = sqlite3.Row
 
     # Enable WAL and foreign keys
     conn.execute("PRAGMA journal_mode = WAL")
+    # In WAL mode NORMAL only fsyncs at checkpoints: commits survive an application
+    # crash, and at worst the last few are lost on power failure (a rescan redoes them)
+    conn.execute("PRAGMA synchronous = NORMAL")
     conn.execute("PRAGMA foreign_keys = ON")
+    # 64 MB page cache (default is 2 MB): keeps a whole library's tracks table hot
+    # across the full-table scans done by LIKE/REGEXP searches and rescans
+    conn.execute("PRAGMA cache_size = -64000")
+
+    # SQL helper functions used by search, query and analyze
+    register_functions(conn)
 
     # Create tables if not exist
     _create_schema(conn)
@@ -45,101 +57,188 @@ def get_db(db_path: Path) -> sqlite3.Connection:
     return conn
 
 
+def update_stats(conn: sqlite3.Connection):
+    """
+    Refresh the query planner's table statistics (sqlite_stat1) after a bulk load.
+
+    Lets SQLite pick between e.g. idx_tracks_bpm and idx_tracks_artist_title by
+    selectivity. analysis_limit samples each index instead of reading all of it,
+    so this stays cheap on large libraries.
+    """
+    conn.execute("PRAGMA analysis_limit = 1000")
+    conn.execute("ANALYZE")
+    conn.commit()
+
+
+def register_functions(conn: sqlite3.Connection):
+    """
+    Register REGEXP and DIRNAME SQL functions on the connection.
+
+    Done once per connection: calling create_function again expires every
+    cached prepared statement on that connection.
+    """
+    # REGEXP function for regex matching (deterministic: same inputs, same result)
+    conn.create_function("REGEXP", 2, _sqlite_regexp, deterministic=True)
+
+    # DIRNAME function to extract directory path
+    conn.create_function("DIRNAME", 1,
+        lambda p: str(Path(p).parent) if p else None)
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_regexp(pattern: str) -> re.Pattern:
+    """Compile a REGEXP pattern once; SQLite calls REGEXP per row with the same pattern."""
+    return re.compile(pattern, re.IGNORECASE)
+
+
+def _sqlite_regexp(pattern: str, value) -> bool:
+    """REGEXP(pattern, value): case-insensitive re.search; NULL or empty values never match."""
+    if not value:
+        return False
+    return _compile_regexp(pattern).search(value) is not None
+
+
+_SCHEMA_SQL = """
+-- tracks table
+CREATE TABLE IF NOT EXISTS tracks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    filepath TEXT UNIQUE,
+    filename TEXT,
+    filename_lower TEXT,
+    source_label TEXT,
+    title TEXT,
+    artist TEXT,
+    album TEXT,
+    genre TEXT,
+    bpm REAL,
+    musical_key TEXT,
+    duration_sec REAL,
+    bitrate INTEGER,
+    sample_rate INTEGER,
+    file_format TEXT,
+    file_size INTEGER,
+    in_rekordbox INTEGER DEFAULT 0,
+    rb_track_id TEXT,
+    rb_location TEXT,
+    comments TEXT,
+    rating INTEGER,
+    label TEXT,
+    remixer TEXT,
+    color TEXT,
+    date_indexed TEXT DEFAULT (datetime('now'))
+);
+
+-- cue_points table
+CREATE TABLE IF NOT EXISTS cue_points (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    track_id INTEGER NOT NULL,
+    cue_type TEXT,
+    cue_name TEXT,
+    cue_num INTEGER,
+    position_sec REAL,
+    is_loop INTEGER DEFAULT 0,
+    loop_end_sec REAL,
+    color_red INTEGER,
+    color_green INTEGER,
+    color_blue INTEGER,
+    FOREIGN KEY (track_id) REFERENCES tracks(id) ON DELETE CASCADE
+);
+
+-- playlists table
+CREATE TABLE IF NOT EXISTS playlists (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    playlist_name TEXT,
+    playlist_path TEXT,
+    track_id INTEGER,
+    position INTEGER,
+    FOREIGN KEY (track_id) REFERENCES tracks(id) ON DELETE CASCADE
+);
+
+-- anlz_data table
+CREATE TABLE IF NOT EXISTS anlz_data (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    track_id INTEGER NOT NULL,
+    has_beat_grid INTEGER DEFAULT 0,
+    has_waveform INTEGER DEFAULT 0,
+    has_waveform_color INTEGER DEFAULT 0,
+    anlz_path TEXT,
+    FOREIGN KEY (track_id) REFERENCES tracks(id) ON DELETE CASCADE
+);
+
+-- Indexes for common search queries
+CREATE INDEX IF NOT EXISTS idx_tracks_filename ON tracks(filename);
+CREATE INDEX IF NOT EXISTS idx_tracks_filename_lower ON tracks(filename_lower);
+-- (artist, title) matches the search ORDER BY, so listings need no sort and stop at LIMIT;
+-- it also serves artist lookups, replacing the old artist-only index
+DROP INDEX IF EXISTS idx_tracks_artist;
+CREATE INDEX IF NOT EXISTS idx_tracks_artist_title ON tracks(artist, title);
+CREATE INDEX IF NOT EXISTS idx_tracks_title ON tracks(title);
+CREATE INDEX IF NOT EXISTS idx_tracks_genre ON tracks(genre);
+CREATE INDEX IF NOT EXISTS idx_tracks_bpm ON tracks(bpm);
+CREATE INDEX IF NOT EXISTS idx_tracks_source_label ON tracks(source_label);
+CREATE INDEX IF NOT EXISTS idx_tracks_musical_key ON tracks(musical_key);
+-- (track_id, cue_type) covers the per-track cue counts; it replaces the old track_id index
+DROP INDEX IF EXISTS idx_cue_points_track_id;
+CREATE INDEX IF NOT EXISTS idx_cue_points_track_type ON cue_points(track_id, cue_type);
+CREATE INDEX IF NOT EXISTS idx_playlists_track_id ON playlists(track_id);
+
+-- Full-text index over the free-text search columns (external content: rows live in tracks)
+CREATE VIRTUAL TABLE IF NOT EXISTS tracks_fts USING fts5(
+    title, artist, album, filename, genre, remixer, label, comments,
+    content='tracks', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+-- Keep tracks_fts in step with tracks
+CREATE TRIGGER IF NOT EXISTS tracks_fts_ai AFTER INSERT ON tracks BEGIN
+    INSERT INTO tracks_fts (rowid, title, artist, album, filename, genre, remixer, label, comments)
+    VALUES (new.id, new.title, new.artist, new.album, new.filename, new.genre, new.remixer, new.label, new.comments);
+END;
+CREATE TRIGGER IF NOT EXISTS tracks_fts_ad AFTER DELETE ON tracks BEGIN
+    INSERT INTO tracks_fts (tracks_fts, rowid, title, artist, album, filename, genre, remixer, label, comments)
+    VALUES ('delete', old.id, old.title, old.artist, old.album, old.filename, old.genre, old.remixer, old.label, old.comments);
+END;
+CREATE TRIGGER IF NOT EXISTS tracks_fts_au
+AFTER UPDATE OF title, artist, album, filename, genre, remixer, label, comments ON tracks BEGIN
+    INSERT INTO tracks_fts (tracks_fts, rowid, title, artist, album, filename, genre, remixer, label, comments)
+    VALUES ('delete', old.id, old.title, old.artist, old.album, old.filename, old.genre, old.remixer, old.label, old.comments);
+    INSERT INTO tracks_fts (rowid, title, artist, album, filename, genre, remixer, label, comments)
+    VALUES (new.id, new.title, new.artist, new.album, new.filename, new.genre, new.remixer, new.label, new.comments);
+END;
+
+-- Trigram index over the same columns, for substring (single-term) free-text search
+CREATE VIRTUAL TABLE IF NOT EXISTS tracks_fts_trigram USING fts5(
+    title, artist, album, filename, genre, remixer, label, comments,
+    content='tracks', content_rowid='id',
+    tokenize='trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS tracks_fts_trigram_ai AFTER INSERT ON tracks BEGIN
+    INSERT INTO tracks_fts_trigram (rowid, title, artist, album, filename, genre, remixer, label, comments)
+    VALUES (new.id, new.title, new.artist, new.album, new.filename, new.genre, new.remixer, new.label, new.comments);
+END;
+CREATE TRIGGER IF NOT EXISTS tracks_fts_trigram_ad AFTER DELETE ON tracks BEGIN
+    INSERT INTO tracks_fts_trigram (tracks_fts_trigram, rowid, title, artist, album, filename, genre, remixer, label, comments)
+    VALUES ('delete', old.id, old.title, old.artist, old.album, old.filename, old.genre, old.remixer, old.label, old.comments);
+END;
+CREATE TRIGGER IF NOT EXISTS tracks_fts_trigram_au
+AFTER UPDATE OF title, artist, album, filename, genre, remixer, label, comments ON tracks BEGIN
+    INSERT INTO tracks_fts_trigram (tracks_fts_trigram, rowid, title, artist, album, filename, genre, remixer, label, comments)
+    VALUES ('delete', old.id, old.title, old.artist, old.album, old.filename, old.genre, old.remixer, old.label, old.comments);
+    INSERT INTO tracks_fts_trigram (rowid, title, artist, album, filename, genre, remixer, label, comments)
+    VALUES (new.id, new.title, new.artist, new.album, new.filename, new.genre, new.remixer, new.label, new.comments);
+END;
+"""
+
+# Full-text tables in _SCHEMA_SQL; each is rebuilt from tracks when first created
+_FTS_TABLES = ("tracks_fts", "tracks_fts_trigram")
+
+
 def _create_schema(conn: sqlite3.Connection):
-    """Create all tables if they don't exist."""
-
-    # tracks table
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS tracks (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            filepath TEXT UNIQUE,
-            filename TEXT,
-            filename_lower TEXT,
-            source_label TEXT,
-            title TEXT,
-            artist TEXT,
-            album TEXT,
-            genre TEXT,
-            bpm REAL,
-            musical_key TEXT,
-            duration_sec REAL,
-            bitrate INTEGER,
-            sample_rate INTEGER,
-            file_format TEXT,
-            file_size INTEGER,
-            in_rekordbox INTEGER DEFAULT 0,
-            rb_track_id TEXT,
-            rb_location TEXT,
-            comments TEXT,
-            rating INTEGER,
-            label TEXT,
-            remixer TEXT,
-            color TEXT,
-            date_indexed TEXT DEFAULT (datetime('now'))
-        )
-    """)
-
-    # cue_points table
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS cue_points (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            track_id INTEGER NOT NULL,
-            cue_type TEXT,
-            cue_name TEXT,
-            cue_num INTEGER,
-            position_sec REAL,
-            is_loop INTEGER DEFAULT 0,
-            loop_end_sec REAL,
-            color_red INTEGER,
-            color_green INTEGER,
-            color_blue INTEGER,
-            FOREIGN KEY (track_id) REFERENCES tracks(id) ON DELETE CASCADE
-        )
-    """)
-
-    # playlists table
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS playlists (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            playlist_name TEXT,
-            playlist_path TEXT,
-            track_id INTEGER,
-            position INTEGER,
-            FOREIGN KEY (track_id) REFERENCES tracks(id) ON DELETE CASCADE
-        )
-    """)
-
-    # anlz_data table
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS anlz_data (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            track_id INTEGER NOT NULL,
-            has_beat_grid INTEGER DEFAULT 0,
-            has_waveform INTEGER DEFAULT 0,
-            has_waveform_color INTEGER DEFAULT 0,
-            anlz_path TEXT,
-            FOREIGN KEY (track_id) REFERENCES tracks(id) ON DELETE CASCADE
-        )
-    """)
-
-    # Create indexes
-    _create_indexes(conn)
-
-
-def _create_indexes(conn: sqlite3.Connection):
-    """Create indexes for common search queries."""
-    indexes = [
-        ("idx_tracks_filename", "tracks", "filename"),
-        ("idx_tracks_filename_lower", "tracks", "filename_lower"),
-        ("idx_tracks_artist", "tracks", "artist"),
-        ("idx_tracks_title", "tracks", "title"),
-        ("idx_tracks_genre", "tracks", "genre"),
-        ("idx_tracks_bpm", "tracks", "bpm"),
-        ("idx_tracks_source_label", "tracks", "source_label"),
-        ("idx_tracks_musical_key", "tracks", "musical_key"),
-        ("idx_cue_points_track_id", "cue_points", "track_id"),
-        ("idx_playlists_track_id", "playlists", "track_id"),
-    ]
-
-    for idx_name, table, column in indexes:
-        conn.execute(f"CREATE INDEX IF NOT EXISTS {idx_name} ON {table}({column})")
+    """Create all tables and indexes if they don't exist (one executescript call)."""
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+    conn.executescript(_SCHEMA_SQL)
+    for table in _FTS_TABLES:
+        if table not in existing:
+            # Databases created before this full-text index: index their existing tracks
+            conn.execute(f"INSERT INTO {table} ({table}) VALUES ('rebuild')")
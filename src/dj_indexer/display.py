@@ -1,60 +1,59 @@
 """Output formatting for search results and cue details."""
 
-from typing import List, Tuple, Any
+import functools
+import sys
+from typing import Any, List, Optional, TextIO, Tuple
 
 
-def print_results(rows: List[Tuple[Any, ...]], header: str = "Search results"):
+def print_results(rows: List[Tuple[Any, ...]], header: str = "Search results", file: Optional[TextIO] = None):
     """
     Print formatted search results.
 
     Shows artist, title (or filename if no title), BPM, key, source label.
     Displays [RB] badge if in rekordbox, [XH/YC] for cues (X hot, Y total).
+    The listing is assembled in memory and written with a single write() call.
 
     Args:
         rows: List of result rows from database query
         header: Header text to display
+        file: Output stream (default: sys.stdout)
     """
+    file = file or sys.stdout
     if not rows:
-        print(f"\n{header}: 0 tracks\n")
+        file.write(f"\n{header}: 0 tracks\n\n")
         return
 
-    count = len(rows)
-    print(f"\n{header} ({count} tracks):\n")
+    parts = [f"\n{header} ({len(rows)} tracks):\n\n"]
+    parts.extend(map(_format_result_row, rows))
+    file.write("".join(parts))
 
-    for row in rows:
-        # Row format: (id, artist, title, filename, filepath, bpm, musical_key, source_label, in_rekordbox, num_hot_cues, num_cues)
-        artist, title, filename, filepath, bpm, musical_key, source_label, in_rekordbox, num_hot_cues, num_cues = row[1:11]
 
-        # Build display title
-        display_title = title if title else filename
-        if artist:
-            display_line = f"   {artist} -- {display_title}"
-        else:
-            display_line = f"   {display_title}"
+def _format_result_row(row: Tuple[Any, ...]) -> str:
+    """Three-line result entry (title, metadata with badges, filepath) plus a blank line."""
+    # Row format: (id, artist, title, filename, filepath, bpm, musical_key, source_label, in_rekordbox, num_hot_cues, num_cues)
+    artist, title, filename, filepath, bpm, musical_key, source_label, in_rekordbox, num_hot_cues, num_cues = row[1:11]
 
-        print(display_line)
-
-        # Build metadata line
-        bpm_str = f"{bpm:.0f}" if bpm else "?"
-        key_str = musical_key if musical_key else "?"
-        badges = ""
+    # Build display title
+    display_title = title if title else filename
+    display_line = f"   {artist} -- {display_title}" if artist else f"   {display_title}"
 
-        # Add rekordbox badge
-        if in_rekordbox:
-            badges += " [RB]"
+    # Build metadata line
+    bpm_str = f"{bpm:.0f}" if bpm else "?"
+    key_str = musical_key if musical_key else "?"
+    badges = ""
 
-        # Add cue badges
-        if in_rekordbox:
-            if num_cues == 0:
-                badges += "  [NO CUES]"
-            elif num_hot_cues is not None:
-                badges += f"  [{num_hot_cues}H/{num_cues}C]"
+    # Add rekordbox and cue badges
+    if in_rekordbox:
+        badges = " [RB]"
+        if num_cues == 0:
+            badges += "  [NO CUES]"
+        elif num_hot_cues is not None:
+            badges += f"  [{num_hot_cues}H/{num_cues}C]"
 
-        print(f"     {bpm_str} BPM | {key_str} | {source_label}{badges}")
-        print(f"     {filepath}\n")
+    return f"{display_line}\n     {bpm_str} BPM | {key_str} | {source_label}{badges}\n     {filepath}\n\n"
 
 
-def print_cue_details(track: Tuple[Any, ...], cues: List[Tuple[Any, ...]]):
+def print_cue_details(track: Tuple[Any, ...], cues: List[Tuple[Any, ...]], file: Optional[TextIO] = None):
     """
     Print detailed cue point information for a track.
 
@@ -68,6 +67,7 @@ def print_cue_details(track: Tuple[Any, ...], cues: List[Tuple[Any, ...]]):
     Args:
         track: Track row from database
         cues: List of cue point rows
+        file: Output stream (default: sys.stdout)
     """
     # Track format: (id, artist, title, filename, bpm, musical_key, source_label, duration_sec, ...)
     artist, title, filename, bpm, musical_key, source_label, duration_sec = track[1:8]
@@ -77,20 +77,20 @@ def print_cue_details(track: Tuple[Any, ...], cues: List[Tuple[Any, ...]]):
     duration_str = _format_duration(duration_sec) if duration_sec else "?"
 
     if artist:
-        print(f"\n{artist} — {display_title} ({duration_str})")
+        lines = [f"\n{artist} — {display_title} ({duration_str})"]
     else:
-        print(f"\n{display_title} ({duration_str})")
+        lines = [f"\n{display_title} ({duration_str})"]
 
     # Build metadata line
     bpm_str = f"{bpm:.0f}" if bpm else "?"
     key_str = musical_key if musical_key else "?"
-    print(f"   {bpm_str} BPM | {key_str} | {source_label}")
+    lines.append(f"   {bpm_str} BPM | {key_str} | {source_label}")
 
-    # Print cue points
+    # Cue points
     if not cues:
-        print("   Cue points: None")
+        lines.append("   Cue points: None")
     else:
-        print(f"   Cue points ({len(cues)}):")
+        lines.append(f"   Cue points ({len(cues)}):")
         for cue in cues:
             # Cue format: (id, track_id, cue_type, cue_name, cue_num, position_sec, is_loop, loop_end_sec, ...)
             cue_type, cue_name, position_sec = cue[2], cue[3], cue[5]
@@ -110,22 +110,22 @@ def print_cue_details(track: Tuple[Any, ...], cues: List[Tuple[Any, ...]]):
 
             # Format position
             time_str = _format_duration(position_sec)
-            print(f"     [{time_str}] {cue_label}")
+            lines.append(f"     [{time_str}] {cue_label}")
 
-    print()
+    lines.append("\n")
+    (file or sys.stdout).write("\n".join(lines))
 
 
 def _format_duration(seconds: float) -> str:
     """Format duration in seconds to H:MM:SS or MM:SS format."""
     if seconds is None:
         return "?"
+    return _format_whole_seconds(int(seconds))
 
-    total_seconds = int(seconds)
-    hours = total_seconds // 3600
-    minutes = (total_seconds % 3600) // 60
-    secs = total_seconds % 60
 
-    if hours > 0:
-        return f"{hours}:{minutes:02d}:{secs:02d}"
-    else:
-        return f"{minutes}:{secs:02d}"
+@functools.lru_cache(maxsize=1024)
+def _format_whole_seconds(total_seconds: int) -> str:
+    """H:MM:SS or MM:SS for whole seconds; cached since listings repeat the same values."""
+    minutes, secs = divmod(total_seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
@@ -4,6 +4,11 @@ import csv
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 
+# Column names treated as file paths when path conversion is requested
+_PATH_COLUMNS = frozenset(('filepath', 'path', 'file_path'))
+
+_WRITE_BUFFER_SIZE = 1 << 20
+
 
 def export_to_csv(
     rows: List[tuple],
@@ -47,31 +52,30 @@ def export_to_csv(
             print(f"\nError: No valid columns selected.\n")
             return
 
-    # Write CSV
+    # Positions (within export_cols) of path columns to convert, resolved once
+    path_positions = ()
+    if path_conversion:
+        from_platform = path_conversion.get('from_platform')
+        to_platform = path_conversion.get('to_platform')
+        path_positions = tuple(
+            pos for pos, col in enumerate(export_cols) if col in _PATH_COLUMNS
+        )
+
+    def export_row(row):
+        values = [row[idx] for idx in col_indices]
+        for pos in path_positions:
+            values[pos] = _convert_path(
+                values[pos], from_platform, to_platform, volume_mappings
+            )
+        return values
+
+    # Write CSV through a 1 MiB buffer in a single writerows() pass
     try:
-        with open(output_path, 'w', newline='', encoding='utf-8') as f:
+        with open(output_path, 'w', newline='', encoding='utf-8',
+                  buffering=_WRITE_BUFFER_SIZE) as f:
             writer = csv.writer(f)
             writer.writerow(export_cols)
-
-            for row in rows:
-                export_row = []
-                for idx in col_indices:
-                    value = row[idx]
-
-                    # Convert path if requested
-                    if (path_conversion and
-                        export_cols[col_indices.index(idx)] in
-                        ('filepath', 'path', 'file_path')):
-                        value = _convert_path(
-                            value,
-                            path_conversion.get('from_platform'),
-                            path_conversion.get('to_platform'),
-                            volume_mappings
-                        )
-
-                    export_row.append(value)
-
-                writer.writerow(export_row)
+            writer.writerows(map(export_row, rows))
 
         print(f"\n✓ Exported {len(rows)} rows to {output_path}")
         print(f"  Columns: {', '.join(export_cols)}\n")
@@ -80,6 +84,24 @@ def export_to_csv(
         print(f"\nError writing CSV: {e}\n")
 
 
+def parse_volume_map(entries: Optional[List[str]]) -> Optional[Dict[str, str]]:
+    """
+    Parse --volume-map entries into a volume-to-drive mapping.
+
+    Args:
+        entries: Mapping strings like ["USB1=E", "USB2=F"]; entries without '=' are ignored
+
+    Returns:
+        Dict like {"USB1": "E", "USB2": "F"}, or None if no entries were given
+    """
+    if not entries:
+        return None
+    return {
+        name.strip(): drive.strip()
+        for name, drive in (entry.split('=', 1) for entry in entries if '=' in entry)
+    }
+
+
 def _convert_path(
     filepath: Optional[str],
     from_platform: Optional[str],
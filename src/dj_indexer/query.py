@@ -2,75 +2,84 @@
 
 import sqlite3
 import re
+import sys
 from pathlib import Path
-from typing import Tuple, List, Optional
+from typing import Tuple, List, Optional, TextIO
 
+# Leading-whitespace-tolerant, case-insensitive SELECT check, compiled once
+_SELECT_RE = re.compile(r"\s*select\b", re.IGNORECASE)
 
-def run_query(conn: sqlite3.Connection, sql: str, export_args: Optional[object] = None):
+
+def run_query(
+    conn: sqlite3.Connection,
+    sql: str,
+    export_args: Optional[object] = None,
+    file: Optional[TextIO] = None,
+):
     """
     Execute a raw SQL SELECT query and print results in tabular format.
 
-    Registers REGEXP and DIRNAME helper functions for use in queries.
+    REGEXP and DIRNAME helper functions are available (registered by db.get_db).
 
     Args:
         conn: SQLite database connection
         sql: SQL SELECT statement to execute
         export_args: Optional args object for CSV export (with export_csv, columns, path_conversion, volume_map attributes)
+        file: Stream for the printed output (default: sys.stdout)
 
     Raises:
         ValueError: If SQL is not a SELECT statement
     """
     # Validate that this is a SELECT query
-    sql_stripped = sql.strip()
-    if not sql_stripped.upper().startswith("SELECT"):
+    if not _SELECT_RE.match(sql):
         raise ValueError("Only SELECT statements are supported")
+    sql_stripped = sql.strip()
+    file = file or sys.stdout
 
     # Execute and get results
-    rows, column_names = _execute_query(conn, sql_stripped)
+    rows, column_names = _execute_query(conn, sql_stripped, file)
 
     if rows is None:
         return
 
     # Print results
-    _print_tabular_results(rows, column_names)
+    _print_tabular_results(rows, column_names, file)
 
     # Handle CSV export if requested
     if export_args and hasattr(export_args, 'export_csv') and export_args.export_csv:
         _export_query_results(rows, column_names, export_args)
 
 
-def _execute_query(conn: sqlite3.Connection, sql: str) -> Tuple[Optional[List], Optional[List[str]]]:
+def _execute_query(conn: sqlite3.Connection, sql: str, file: Optional[TextIO] = None) -> Tuple[Optional[List], Optional[List[str]]]:
     """
     Execute a SQL SELECT query and return rows and column names.
 
     Args:
         conn: SQLite database connection
         sql: SQL SELECT statement (must be stripped and validated)
+        file: Stream for error messages (default: sys.stdout)
 
     Returns:
         Tuple of (rows, column_names) or (None, None) on error
     """
-    # Register helper functions
-    _register_helpers(conn)
-
     cursor = conn.cursor()
     try:
         cursor.execute(sql)
         rows = cursor.fetchall()
     except sqlite3.Error as e:
-        print(f"\nSQL Error: {e}\n")
+        print(f"\nSQL Error: {e}\n", file=file)
         return None, None
 
     # Get column names from cursor description
     if not cursor.description:
-        print("\nNo results returned.\n")
+        print("\nNo results returned.\n", file=file)
         return None, None
 
     column_names = [desc[0] for desc in cursor.description]
     return rows, column_names
 
 
-def _print_tabular_results(rows: List, column_names: List[str]):
+def _print_tabular_results(rows: List, column_names: List[str], file: Optional[TextIO] = None):
     """Print query results in tabular format."""
     # Calculate column widths
     col_widths = [len(name) for name in column_names]
@@ -80,17 +89,17 @@ def _print_tabular_results(rows: List, column_names: List[str]):
             col_widths[i] = max(col_widths[i], len(cell_str))
 
     # Print header
-    print()
+    print(file=file)
     header_parts = []
     for name, width in zip(column_names, col_widths):
         header_parts.append(name.ljust(width))
-    print("   " + " | ".join(header_parts))
+    print("   " + " | ".join(header_parts), file=file)
 
     # Print separator
     sep_parts = []
     for width in col_widths:
         sep_parts.append("-" * width)
-    print("   " + "-+-".join(sep_parts))
+    print("   " + "-+-".join(sep_parts), file=file)
 
     # Print rows
     for row in rows:
@@ -98,10 +107,10 @@ def _print_tabular_results(rows: List, column_names: List[str]):
         for cell, width in zip(row, col_widths):
             cell_str = _format_cell(cell)
             row_parts.append(cell_str.ljust(width))
-        print("   " + " | ".join(row_parts))
+        print("   " + " | ".join(row_parts), file=file)
 
     # Print summary
-    print(f"\n({len(rows)} row{'s' if len(rows) != 1 else ''})\n")
+    print(f"\n({len(rows)} row{'s' if len(rows) != 1 else ''})\n", file=file)
 
 
 def _format_cell(value):
@@ -121,13 +130,7 @@ def _export_query_results(rows: List, column_names: List[str], export_args: obje
     from . import export_results
 
     # Parse volume mappings from format: ["USB1=E", "USB2=F"]
-    volume_mappings = None
-    if hasattr(export_args, 'volume_map') and export_args.volume_map:
-        volume_mappings = {}
-        for mapping in export_args.volume_map:
-            if '=' in mapping:
-                volume_name, drive = mapping.split('=', 1)
-                volume_mappings[volume_name.strip()] = drive.strip()
+    volume_mappings = export_results.parse_volume_map(getattr(export_args, 'volume_map', None))
 
     # Parse path conversion direction
     path_conversion = None
@@ -146,14 +149,3 @@ def _export_query_results(rows: List, column_names: List[str], export_args: obje
         path_conversion=path_conversion,
         volume_mappings=volume_mappings
     )
-
-
-def _register_helpers(conn: sqlite3.Connection):
-    """Register REGEXP and DIRNAME functions on the connection."""
-    # REGEXP function for regex matching
-    conn.create_function("REGEXP", 2,
-        lambda pat, val: bool(re.search(pat, val, re.IGNORECASE)) if val else False)
-
-    # DIRNAME function to extract directory path
-    conn.create_function("DIRNAME", 1,
-        lambda p: str(Path(p).parent) if p else None)
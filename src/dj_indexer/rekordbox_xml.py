@@ -36,6 +36,20 @@ def import_xml(conn: sqlite3.Connection, xml_path: Path):
     except Exception as e:
         raise ValueError(f"Failed to parse XML file: {e}")
 
+    import_parsed_xml(conn, xml)
+
+
+def import_parsed_xml(conn: sqlite3.Connection, xml: RekordboxXml):
+    """
+    Import an already-parsed rekordbox XML collection.
+
+    Phases 2-4 of import_xml, split out so a parsed RekordboxXml can be
+    reused (the parse is the expensive part). The xml object is only read.
+
+    Args:
+        conn: SQLite database connection
+        xml: Parsed pyrekordbox.rbxml.RekordboxXml
+    """
     print(f"      Product: {xml.product_name} {xml.product_version}")
     print(f"      Tracks: {xml.num_tracks}\n")
 
@@ -259,8 +273,9 @@ def import_xml(conn: sqlite3.Connection, xml_path: Path):
     else:
         print(f"      No playlists found\n")
 
-    # Final commit to flush all changes
+    # Final commit to flush all changes, then refresh planner statistics
     conn.commit()
+    db.update_stats(conn)
 
     # Summary
     print(f"{'='*60}")
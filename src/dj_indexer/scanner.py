@@ -1,7 +1,10 @@
 """USB/directory scanning with mutagen audio metadata extraction."""
 
+import os
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Iterator
 
 import mutagen
 
@@ -13,6 +16,12 @@ AUDIO_EXTENSIONS = {
     ".ogg", ".opus", ".wma", ".alac"
 }
 
+# Tracks upserted per executemany/commit
+_BATCH_SIZE = 100
+
+# Metadata is read on worker threads (mostly file I/O); DB writes stay on the caller's thread
+_MAX_WORKERS = min(32, (os.cpu_count() or 1) * 2)
+
 
 def scan_directory(conn: sqlite3.Connection, directory: str, label: str):
     """
@@ -28,36 +37,89 @@ def scan_directory(conn: sqlite3.Connection, directory: str, label: str):
 
     print(f"Scanning {directory} with label '{label}'...")
 
+    # Sorted so tracks are written in a deterministic order
+    files = sorted(_iter_audio_files(directory))
+
     count = 0
-    for audio_file in directory.rglob("*"):
-        # Skip non-files and non-audio files
-        if not audio_file.is_file():
-            continue
-        if audio_file.suffix.lower() not in AUDIO_EXTENSIONS:
-            continue
+    batch = []
+    # Not a with-block: its exit waits for every queued read, so an error or Ctrl-C in
+    # the write loop would only surface once the whole tree had been read
+    executor = ThreadPoolExecutor(max_workers=_MAX_WORKERS)
+    try:
+        # map() yields results in input order
+        all_metadata = executor.map(_extract_metadata, (audio_file for audio_file, _ in files))
+        for (audio_file, file_size), metadata in zip(files, all_metadata):
+            if metadata is None:
+                print(f"  [WARN] Skipped unreadable file: {audio_file}")
+                continue
+
+            batch.append((audio_file, _track_values(audio_file, label, metadata, file_size)))
+            if len(batch) >= _BATCH_SIZE:
+                count += _write_batch(conn, batch)
+                batch = []
+                print(f"  Indexed {count} tracks...")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
-        # Extract metadata
-        metadata = _extract_metadata(audio_file)
-        if metadata is None:
-            print(f"  [WARN] Skipped unreadable file: {audio_file}")
-            continue
+    if batch:
+        count += _write_batch(conn, batch)
 
-        # Insert/update in database
-        try:
-            _insert_or_update_track(conn, audio_file, label, metadata)
-            count += 1
+    db.update_stats(conn)
+    print(f"Scan complete. Indexed {count} tracks.")
 
-            # Print progress every 100 tracks
-            if count % 100 == 0:
-                print(f"  Indexed {count} tracks...")
 
+def _write_batch(conn: sqlite3.Connection, batch: list) -> int:
+    """
+    Upsert a batch of (filepath, values) pairs in one transaction; return rows written.
+
+    If the batch fails, it is retried row by row so only the offending files are skipped.
+    """
+    try:
+        with conn:
+            conn.executemany(_UPSERT_SQL, [values for _, values in batch])
+        return len(batch)
+    except sqlite3.Error:
+        pass
+
+    written = 0
+    for audio_file, values in batch:
+        try:
+            with conn:
+                conn.execute(_UPSERT_SQL, values)
+            written += 1
         except sqlite3.Error as e:
             print(f"  [WARN] Database error for {audio_file}: {e}")
-            continue
+    return written
 
-    # Final commit
-    conn.commit()
-    print(f"Scan complete. Indexed {count} tracks.")
+
+def _iter_audio_files(directory: Path) -> Iterator[tuple[Path, int]]:
+    """
+    Yield (path, size in bytes) for every audio file under directory, recursively.
+
+    Uses os.scandir so file type and size come from the directory entry instead of
+    separate stat calls per path. Like Path.rglob, symlinked directories are not
+    descended into; symlinked files are followed.
+    """
+    pending = [directory]
+    while pending:
+        try:
+            entries = os.scandir(pending.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(Path(entry.path))
+                        continue
+                    if not entry.is_file():
+                        continue
+                    if os.path.splitext(entry.name)[1].lower() not in AUDIO_EXTENSIONS:
+                        continue
+                    file_size = entry.stat().st_size
+                except OSError:
+                    continue
+                yield Path(entry.path), file_size
 
 
 def _validate_directory(directory: Path):
@@ -222,18 +284,42 @@ def _get_asf_text(tags, key: str) -> str | None:
     return None
 
 
-def _insert_or_update_track(conn: sqlite3.Connection, filepath: Path, label: str, metadata: dict):
-    """Insert or update a track in the database."""
-    filepath_str = str(filepath)
+# Insert, or update an existing track by filepath (preserving rekordbox data)
+_UPSERT_SQL = """
+    INSERT INTO tracks (
+        filepath, filename, filename_lower, source_label, title, artist, album, genre,
+        bpm, musical_key, duration_sec, bitrate, sample_rate, file_format, file_size,
+        comments, label, remixer
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(filepath) DO UPDATE SET
+        filename = COALESCE(NULLIF(excluded.filename, ''), tracks.filename),
+        source_label = excluded.source_label,
+        title = COALESCE(NULLIF(excluded.title, ''), tracks.title),
+        artist = COALESCE(NULLIF(excluded.artist, ''), tracks.artist),
+        album = COALESCE(NULLIF(excluded.album, ''), tracks.album),
+        genre = COALESCE(NULLIF(excluded.genre, ''), tracks.genre),
+        bpm = COALESCE(excluded.bpm, tracks.bpm),
+        musical_key = COALESCE(NULLIF(excluded.musical_key, ''), tracks.musical_key),
+        duration_sec = COALESCE(excluded.duration_sec, tracks.duration_sec),
+        bitrate = COALESCE(excluded.bitrate, tracks.bitrate),
+        sample_rate = COALESCE(excluded.sample_rate, tracks.sample_rate),
+        file_format = COALESCE(NULLIF(excluded.file_format, ''), tracks.file_format),
+        file_size = COALESCE(excluded.file_size, tracks.file_size),
+        comments = COALESCE(NULLIF(excluded.comments, ''), tracks.comments),
+        label = COALESCE(NULLIF(excluded.label, ''), tracks.label),
+        remixer = COALESCE(NULLIF(excluded.remixer, ''), tracks.remixer),
+        date_indexed = datetime('now')
+"""
+
+
+def _track_values(filepath: Path, label: str, metadata: dict, file_size: int | None) -> tuple:
+    """Build the _UPSERT_SQL parameter tuple for one scanned file."""
     filename = filepath.name
-    filename_lower = filename.lower()
-    file_size = filepath.stat().st_size if filepath.exists() else None
-
-    # Build values tuple
-    values = (
-        filepath_str,
+    return (
+        str(filepath),
         filename,
-        filename_lower,
+        filename.lower(),
         label,
         metadata["title"],
         metadata["artist"],
@@ -250,31 +336,3 @@ def _insert_or_update_track(conn: sqlite3.Connection, filepath: Path, label: str
         metadata["label"],
         metadata["remixer"],
     )
-
-    # Use ON CONFLICT to update existing tracks (but preserve rekordbox data)
-    conn.execute("""
-        INSERT INTO tracks (
-            filepath, filename, filename_lower, source_label, title, artist, album, genre,
-            bpm, musical_key, duration_sec, bitrate, sample_rate, file_format, file_size,
-            comments, label, remixer
-        )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ON CONFLICT(filepath) DO UPDATE SET
-            filename = COALESCE(NULLIF(excluded.filename, ''), tracks.filename),
-            source_label = excluded.source_label,
-            title = COALESCE(NULLIF(excluded.title, ''), tracks.title),
-            artist = COALESCE(NULLIF(excluded.artist, ''), tracks.artist),
-            album = COALESCE(NULLIF(excluded.album, ''), tracks.album),
-            genre = COALESCE(NULLIF(excluded.genre, ''), tracks.genre),
-            bpm = COALESCE(excluded.bpm, tracks.bpm),
-            musical_key = COALESCE(NULLIF(excluded.musical_key, ''), tracks.musical_key),
-            duration_sec = COALESCE(excluded.duration_sec, tracks.duration_sec),
-            bitrate = COALESCE(excluded.bitrate, tracks.bitrate),
-            sample_rate = COALESCE(excluded.sample_rate, tracks.sample_rate),
-            file_format = COALESCE(NULLIF(excluded.file_format, ''), tracks.file_format),
-            file_size = COALESCE(excluded.file_size, tracks.file_size),
-            comments = COALESCE(NULLIF(excluded.comments, ''), tracks.comments),
-            label = COALESCE(NULLIF(excluded.label, ''), tracks.label),
-            remixer = COALESCE(NULLIF(excluded.remixer, ''), tracks.remixer),
-            date_indexed = datetime('now')
-    """, values)
@@ -2,6 +2,7 @@
 
 import sqlite3
 import argparse
+import functools
 import re
 from pathlib import Path
 
@@ -23,11 +24,6 @@ def search_tracks(conn: sqlite3.Connection, args: argparse.Namespace):
         conn: SQLite database connection
         args: Parsed command-line arguments with search parameters
     """
-    # Register REGEXP function if needed
-    if args.regex or args.re or args.no_cues or args.duplicates:
-        conn.create_function("REGEXP", 2,
-            lambda pat, val: bool(re.search(pat, val, re.IGNORECASE)) if val else False)
-
     cursor = conn.cursor()
 
     # Handle special queries first
@@ -98,20 +94,10 @@ def show_cues(conn: sqlite3.Connection, query: str):
         conn: SQLite database connection
         query: Search query to find matching tracks
     """
-    # Register REGEXP function for regex support
-    conn.create_function("REGEXP", 2,
-        lambda pat, val: bool(re.search(pat, val, re.IGNORECASE)) if val else False)
-
     cursor = conn.cursor()
 
     # Find matching tracks with free-text search
-    where_clause = """
-        (title LIKE ? OR artist LIKE ? OR album LIKE ? OR
-         filename LIKE ? OR genre LIKE ? OR remixer LIKE ? OR
-         label LIKE ? OR comments LIKE ?)
-    """
-    search_param = f"%{query}%"
-    params = [search_param] * 8
+    where_clause, params = _free_text_condition(query, "id")
 
     sql = f"""
         SELECT
@@ -144,6 +130,164 @@ def show_cues(conn: sqlite3.Connection, query: str):
         display.print_cue_details(tuple(track), cue_list)
 
 
+# Single-term queries of at least _TRIGRAM_MIN characters use the trigram index, however
+# long; shorter terms have no trigram to look up, so they fall back to LIKE
+_TRIGRAM_MIN = 3
+
+
+# A regex alternative that is a plain literal, optionally ^/$-anchored or wrapped in .*
+_LITERAL_BRANCH_RE = re.compile(r"\^?(?:\.\*)?(?P<literal>[^.^$*+?{}\[\]\\|()]+)(?:\.\*)?\$?")
+
+
+def _regex_prefilter(pattern: str) -> str | None:
+    """
+    Trigram MATCH expression that every match of pattern must satisfy, or None.
+
+    Only alternations of plain ASCII literals of at least _TRIGRAM_MIN characters are
+    handled ("bicep|fisher" -> '"bicep" OR "fisher"', "^Electric.*" -> '"Electric"');
+    any other regex syntax disables the prefilter rather than risk dropping matches.
+    """
+    literals = []
+    for branch in pattern.split("|"):
+        m = _LITERAL_BRANCH_RE.fullmatch(branch)
+        if m is None:
+            return None
+        literal = m["literal"]
+        if not literal.isascii() or len(literal) < _TRIGRAM_MIN:
+            return None
+        literals.append('"' + literal.replace('"', '""') + '"')
+    return " OR ".join(literals)
+
+
+def _fts_query(text: str) -> str | None:
+    """
+    Build an FTS5 MATCH expression from free text, or None if it has no searchable terms.
+
+    Each whitespace-separated term becomes a quoted prefix token ("elec"* matches
+    "Electric"); terms are ANDed and may match in different columns. Quoting keeps
+    FTS5 operators and punctuation in user input from being parsed as query syntax.
+    """
+    terms = [term for term in text.split() if any(ch.isalnum() for ch in term)]
+    if not terms:
+        return None
+    return " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+
+
+def _free_text_condition(query: str, id_column: str):
+    """WHERE condition and params for a free-text query across the text columns."""
+    terms = query.split()
+    if len(terms) == 1 and len(terms[0]) >= _TRIGRAM_MIN:
+        # Single term: substring match (like LIKE '%term%') through the trigram index
+        return (
+            f"{id_column} IN (SELECT rowid FROM tracks_fts_trigram WHERE tracks_fts_trigram MATCH ?)",
+            ['"' + terms[0].replace('"', '""') + '"'],
+        )
+
+    # A single term too short for trigrams stays a substring match ("ep" finds "Bicep")
+    match = None if len(terms) == 1 else _fts_query(query)
+    if match is not None:
+        return f"{id_column} IN (SELECT rowid FROM tracks_fts WHERE tracks_fts MATCH ?)", [match]
+
+    # Short single terms and punctuation-only queries: substring LIKE (full scan)
+    return """
+        (title LIKE ? OR artist LIKE ? OR album LIKE ? OR
+         filename LIKE ? OR genre LIKE ? OR remixer LIKE ? OR
+         label LIKE ? OR comments LIKE ?)
+    """, [f"%{query}%"] * 8
+
+
+# Track columns shown in result listings (display.print_results row layout), tracks aliased t
+_SEARCH_COLS = (
+    "t.id, t.artist, t.title, t.filename, t.filepath, t.bpm, t.musical_key, "
+    "t.source_label, t.in_rekordbox"
+)
+
+# Cue badge counts for tracks aliased t: one indexed lookup per result row
+# (idx_cue_points_track_type) instead of a LEFT JOIN ... GROUP BY over all cues
+_CUE_COUNT_COLUMNS = """
+    (SELECT COUNT(*) FROM cue_points WHERE track_id = t.id AND cue_type LIKE 'hot_cue_%') as num_hot_cues,
+    (SELECT COUNT(*) FROM cue_points WHERE track_id = t.id) as num_cues"""
+
+
+# A regex that is just an unanchored literal, optionally wrapped in .* (".*wave.*")
+_SUBSTRING_REGEX_RE = re.compile(r"(?:\.\*)?(?P<literal>[^.^$*+?{}\[\]\\|()]+)(?:\.\*)?")
+
+
+def _regex_as_like(pattern: str) -> str | None:
+    """
+    LIKE pattern (for ESCAPE '\\') equivalent to a case-insensitive search for pattern, or None.
+
+    Only unanchored ASCII literals qualify: LIKE folds ASCII case only, and a literal
+    regex search is exactly a substring test, which SQLite runs without a Python call.
+    """
+    m = _SUBSTRING_REGEX_RE.fullmatch(pattern)
+    if m is None or not m["literal"].isascii():
+        return None
+    return "%" + m["literal"].replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _field_condition(column: str, value: str, regex: bool):
+    """WHERE condition and param for a field filter (--artist, --title, ...)."""
+    if not regex:
+        return _FIELD_LIKE_SQL[column], f"%{value}%"
+    like_pattern = _regex_as_like(value)
+    if like_pattern is None:
+        return _regexp_condition(column), value
+    return _FIELD_LIKE_ESCAPED_SQL[column], like_pattern
+
+
+@functools.lru_cache(maxsize=None)
+def _regexp_condition(column: str) -> str:
+    """REGEXP(?, column), guarded so NULL and empty values never reach the Python callback."""
+    return f"({column} <> '' AND REGEXP(?, {column}))"
+
+
+# Field filters as (args attribute, tracks column), in WHERE-clause order
+_FIELD_FILTERS = (
+    ("artist", "artist"),
+    ("title", "title"),
+    ("filename", "filename"),
+    ("genre", "genre"),
+    ("key", "musical_key"),
+)
+_FIELD_LIKE_SQL = {column: f"{column} LIKE ?" for _, column in _FIELD_FILTERS}
+_FIELD_LIKE_ESCAPED_SQL = {column: f"{column} LIKE ? ESCAPE '\\'" for _, column in _FIELD_FILTERS}
+
+# Broad --regex: any text column may match
+_BROAD_REGEX_COLUMNS = ("title", "artist", "album", "filename", "genre", "remixer", "label", "comments")
+_BROAD_REGEX_SQL = "(" + " OR ".join(map(_regexp_condition, _BROAD_REGEX_COLUMNS)) + ")"
+_TRIGRAM_PREFILTER_SQL = (
+    "t.id IN (SELECT rowid FROM tracks_fts_trigram WHERE tracks_fts_trigram MATCH ?)"
+)
+
+
+# Result order; the unary + variant keeps the planner from walking idx_tracks_artist_title
+# to skip the sort, which (without STAT4 range estimates) it would otherwise prefer
+# over a range seek on idx_tracks_bpm
+_ORDER_BY_SQL = "t.artist, t.title"
+_ORDER_BY_PLAN_NEUTRAL_SQL = "+t.artist, t.title"
+
+
+@functools.lru_cache(maxsize=64)
+def _sql_template(conditions: tuple[str, ...], order_by: str = _ORDER_BY_SQL) -> str:
+    """
+    Full search SQL for a tuple of WHERE conditions (the query's shape).
+
+    Searches with the same filters set differ only in their parameters, so they get
+    the identical SQL string back; sqlite3's per-connection statement cache is keyed
+    by SQL text, so the prepared statement is reused instead of re-parsed.
+    """
+    where_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
+    return f"""
+        SELECT
+            {_SEARCH_COLS},{_CUE_COUNT_COLUMNS}
+        FROM tracks t
+        {where_clause}
+        ORDER BY {order_by}
+        LIMIT ?
+    """
+
+
 def _build_search_query(args: argparse.Namespace):
     """Build SQL query and parameters from search arguments."""
     conditions = []
@@ -152,63 +296,27 @@ def _build_search_query(args: argparse.Namespace):
     # Determine if we're doing broad regex search
     # If --regex flag is set, use regex instead of LIKE
     if args.regex and args.query:
-        # Broad regex search (replaces free-text LIKE search)
-        conditions.append("""
-            (REGEXP(?, title) OR REGEXP(?, artist) OR REGEXP(?, album) OR
-             REGEXP(?, filename) OR REGEXP(?, genre) OR REGEXP(?, remixer) OR
-             REGEXP(?, label) OR REGEXP(?, comments))
-        """)
-        params.extend([args.query] * 8)
+        # Broad regex search (replaces free-text search); when the pattern implies a
+        # required literal, narrow to trigram-index candidates before calling REGEXP
+        prefilter = _regex_prefilter(args.query)
+        if prefilter is not None:
+            conditions.append(_TRIGRAM_PREFILTER_SQL)
+            params.append(prefilter)
+        conditions.append(_BROAD_REGEX_SQL)
+        params.extend([args.query] * len(_BROAD_REGEX_COLUMNS))
     elif args.query:
-        # Free-text search with LIKE (only if --regex not used)
-        search_param = f"%{args.query}%"
-        conditions.append("""
-            (title LIKE ? OR artist LIKE ? OR album LIKE ? OR
-             filename LIKE ? OR genre LIKE ? OR remixer LIKE ? OR
-             label LIKE ? OR comments LIKE ?)
-        """)
-        params.extend([search_param] * 8)
-
-    # Field-specific filters
-    if args.artist:
-        if args.re:
-            conditions.append("REGEXP(?, artist)")
-            params.append(args.artist)
-        else:
-            conditions.append("artist LIKE ?")
-            params.append(f"%{args.artist}%")
-
-    if args.title:
-        if args.re:
-            conditions.append("REGEXP(?, title)")
-            params.append(args.title)
-        else:
-            conditions.append("title LIKE ?")
-            params.append(f"%{args.title}%")
-
-    if args.filename:
-        if args.re:
-            conditions.append("REGEXP(?, filename)")
-            params.append(args.filename)
-        else:
-            conditions.append("filename LIKE ?")
-            params.append(f"%{args.filename}%")
-
-    if args.genre:
-        if args.re:
-            conditions.append("REGEXP(?, genre)")
-            params.append(args.genre)
-        else:
-            conditions.append("genre LIKE ?")
-            params.append(f"%{args.genre}%")
-
-    if args.key:
-        if args.re:
-            conditions.append("REGEXP(?, musical_key)")
-            params.append(args.key)
-        else:
-            conditions.append("musical_key LIKE ?")
-            params.append(f"%{args.key}%")
+        # Free-text search (only if --regex not used)
+        condition, condition_params = _free_text_condition(args.query, "t.id")
+        conditions.append(condition)
+        params.extend(condition_params)
+
+    # Field-specific filters (LIKE, or regex with --re)
+    for attr, column in _FIELD_FILTERS:
+        value = getattr(args, attr)
+        if value:
+            condition, param = _field_condition(column, value, args.re)
+            conditions.append(condition)
+            params.append(param)
 
     if args.source:
         conditions.append("source_label LIKE ?")
@@ -234,23 +342,10 @@ def _build_search_query(args: argparse.Namespace):
     if args.not_in_rekordbox:
         conditions.append("in_rekordbox = 0")
 
-    # Build WHERE clause
-    where_clause = " AND ".join(conditions) if conditions else "1=1"
-
-    # Build full query
-    sql = f"""
-        SELECT
-            t.id, t.artist, t.title, t.filename, t.filepath, t.bpm, t.musical_key,
-            t.source_label, t.in_rekordbox,
-            COUNT(CASE WHEN cp.cue_type LIKE 'hot_cue_%' THEN 1 END) as num_hot_cues,
-            COUNT(cp.id) as num_cues
-        FROM tracks t
-        LEFT JOIN cue_points cp ON t.id = cp.track_id
-        WHERE {where_clause}
-        GROUP BY t.id
-        ORDER BY t.artist, t.title
-        LIMIT ?
-    """
+    # A BPM bound is best served by seeking idx_tracks_bpm and sorting the matches
+    has_bpm_bound = args.bpm_min is not None or args.bpm_max is not None
+    order_by = _ORDER_BY_PLAN_NEUTRAL_SQL if has_bpm_bound else _ORDER_BY_SQL
+    sql = _sql_template(tuple(conditions), order_by)
     params.append(args.limit)
 
     return sql, params
@@ -279,6 +374,7 @@ def _show_playlists(cursor):
 
 def _show_duplicates(cursor):
     """Show tracks with duplicate filenames across sources."""
+    # Groups stream off idx_tracks_filename_lower in order: one pass, no sort
     cursor.execute("""
         SELECT
             filename_lower, COUNT(*) as count, GROUP_CONCAT(source_label, ', ') as sources
@@ -302,18 +398,16 @@ def _show_duplicates(cursor):
 
 def _show_no_cues(cursor, limit):
     """Show rekordbox tracks without cue points."""
+    # NOT EXISTS probes idx_cue_points_track_type per track while walking tracks in
+    # (artist, title) order, so it stops after `limit` hits; NOT IN / LEFT JOIN would
+    # first build the set of every cued track. Cue counts are 0 by construction.
     cursor.execute(f"""
         SELECT
-            t.id, t.artist, t.title, t.filename, t.filepath, t.bpm, t.musical_key,
-            t.source_label, t.in_rekordbox,
-            COUNT(CASE WHEN cp.cue_type LIKE 'hot_cue_%' THEN 1 END) as num_hot_cues,
-            COUNT(cp.id) as num_cues
+            {_SEARCH_COLS}, 0 as num_hot_cues, 0 as num_cues
         FROM tracks t
-        LEFT JOIN cue_points cp ON t.id = cp.track_id
-        WHERE t.in_rekordbox = 1 AND t.id NOT IN (
-            SELECT DISTINCT track_id FROM cue_points
+        WHERE t.in_rekordbox = 1 AND NOT EXISTS (
+            SELECT 1 FROM cue_points cp WHERE cp.track_id = t.id
         )
-        GROUP BY t.id
         ORDER BY t.artist, t.title
         LIMIT ?
     """, (limit,))
@@ -328,7 +422,8 @@ def _search_playlist(cursor, args, display_module):
     playlist_query = args.playlist
 
     # Find matching playlists
-    if args.re:
+    like_pattern = _regex_as_like(playlist_query) if args.re else None
+    if args.re and like_pattern is None:
         # Build SQL to search with REGEXP
         cursor.execute("""
             SELECT DISTINCT playlist_name, playlist_path
@@ -337,11 +432,18 @@ def _search_playlist(cursor, args, display_module):
         """)
         all_playlists = cursor.fetchall()
 
-        # Filter using Python regex
-        matching = []
-        for pl in all_playlists:
-            if re.search(playlist_query, pl[1], re.IGNORECASE) or re.search(playlist_query, pl[0], re.IGNORECASE):
-                matching.append(pl)
+        # Filter using Python regex (same case-insensitive semantics as REGEXP)
+        pattern = re.compile(playlist_query, re.IGNORECASE)
+        matching = [pl for pl in all_playlists if pattern.search(pl[1]) or pattern.search(pl[0])]
+    elif args.re:
+        # Literal-only regex (".*Chill.*"): the same substring test, done by LIKE in SQL
+        cursor.execute("""
+            SELECT DISTINCT playlist_name, playlist_path
+            FROM playlists
+            WHERE playlist_name LIKE ?1 ESCAPE '\\' OR playlist_path LIKE ?1 ESCAPE '\\'
+            ORDER BY playlist_path
+        """, (like_pattern,))
+        matching = cursor.fetchall()
     else:
         # Use LIKE search
         cursor.execute("""
@@ -362,14 +464,10 @@ def _search_playlist(cursor, args, display_module):
 
         cursor.execute(f"""
             SELECT
-                t.id, t.artist, t.title, t.filename, t.filepath, t.bpm, t.musical_key,
-                t.source_label, t.in_rekordbox,
-                COUNT(CASE WHEN cp.cue_type LIKE 'hot_cue_%' THEN 1 END) as num_hot_cues,
-                COUNT(cp.id) as num_cues,
+                {_SEARCH_COLS},{_CUE_COUNT_COLUMNS},
                 pl.position
             FROM playlists pl
             JOIN tracks t ON pl.track_id = t.id
-            LEFT JOIN cue_points cp ON t.id = cp.track_id
             WHERE pl.playlist_path = ?
             GROUP BY t.id
             ORDER BY pl.position
@@ -385,13 +483,7 @@ def _search_playlist(cursor, args, display_module):
 def _export_search_results(rows, column_names, args):
     """Export search results to CSV with optional path conversion."""
     # Parse volume mappings from format: ["USB1=E", "USB2=F"]
-    volume_mappings = None
-    if args.volume_map:
-        volume_mappings = {}
-        for mapping in args.volume_map:
-            if '=' in mapping:
-                volume_name, drive = mapping.split('=', 1)
-                volume_mappings[volume_name.strip()] = drive.strip()
+    volume_mappings = export_results.parse_volume_map(args.volume_map)
 
     # Parse path conversion direction
     path_conversion = None
@@ -1,62 +1,136 @@
 """Shared test fixtures and configuration."""
 
+import functools
 import shutil
 import sqlite3
-import tempfile
 from pathlib import Path
 
+import mutagen
 import pytest
-from mutagen.flac import FLAC
-from mutagen.id3 import ID3, TIT2, TPE1, TALB, TCON, TBPM, TKEY
-from mutagen.wave import WAVE
-from mutagen.oggvorbis import OggVorbis
-from mutagen.oggflac import OggFLAC
-from mutagen.oggopus import OggOpus
-from mutagen.asf import ASF
+from pyrekordbox.rbxml import RekordboxXml
 
-from dj_indexer import db
+from dj_indexer import db, scanner
+
+# Resolved once at import; fixtures below hand out paths relative to it
+_TESTFILES = Path(__file__).resolve().parent.parent / "testfiles"
+
+
+# Fixtures whose users should share one pytest-xdist worker (run with
+# ``-n auto --dist=loadgroup``) so the sample files are written and scanned once.
+# populated_db is not grouped: each worker builds its own copy and the per-test
+# SAVEPOINT isolates its users, so they can spread across workers.
+_XDIST_GROUPS = {
+    "test_audio_dir": "audio",
+    "scanned_db": "audio",
+}
+
+
+def pytest_addoption(parser):
+    parser.addoption("--run-slow", action="store_true", default=False, help="also run tests marked slow")
+
+
+def pytest_configure(config):
+    # pytest-xdist registers this marker itself; declare it for runs without xdist
+    config.addinivalue_line("markers", "xdist_group(name): run tests of a group on one xdist worker")
+    config.addinivalue_line("markers", "slow: repeats expensive work (e.g. full rescans); skipped without --run-slow")
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip slow tests unless --run-slow; group tests by the expensive fixture they use
+    (no-op without --dist=loadgroup)."""
+    skip_slow = None if config.getoption("--run-slow") else pytest.mark.skip(reason="slow: pass --run-slow")
+    for item in items:
+        if skip_slow and "slow" in item.keywords:
+            item.add_marker(skip_slow)
+        for fixture_name, group in _XDIST_GROUPS.items():
+            if fixture_name in item.fixturenames:
+                item.add_marker(pytest.mark.xdist_group(group))
+                break
+
+
+@functools.cache
+def _schema_template() -> sqlite3.Connection:
+    """Schema-only in-memory database built once per process via db.get_db."""
+    return db.get_db(":memory:")
+
+
+def memory_db(factory: type[sqlite3.Connection] = sqlite3.Connection) -> sqlite3.Connection:
+    """Open an in-memory database with the app schema for tests.
+
+    The schema pages are copied from _schema_template with backup() instead of
+    re-running the DDL; connection-level state (row factory, foreign keys, SQL
+    functions) is not part of the pages, so it is set up here as get_db does.
+    An in-memory DB has no journal file, never fsyncs and is private to its
+    connection, so the journal_mode, synchronous and locking_mode pragmas are moot;
+    temp_store keeps sort/index temp b-trees in RAM too.
+    """
+    conn = sqlite3.connect(":memory:", factory=factory)
+    _schema_template().backup(conn)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    db.register_functions(conn)
+    return conn
+
+
+_INSERT_TRACK_SQL = """
+    INSERT INTO tracks (filepath, filename, filename_lower, source_label,
+                        title, artist, genre, bpm, musical_key, file_format, in_rekordbox)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def insert_tracks(conn: sqlite3.Connection, rows):
+    """Insert (filepath, filename, filename_lower, source_label, title, artist, genre,
+    bpm, musical_key, file_format, in_rekordbox) rows in one transaction."""
+    with conn:
+        conn.executemany(_INSERT_TRACK_SQL, rows)
 
 
 @pytest.fixture
 def test_db():
-    """Create a temporary test database."""
-    with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as f:
-        db_path = Path(f.name)
-
-    conn = db.get_db(db_path)
+    """Create an in-memory test database (no files, nothing to clean up)."""
+    conn = memory_db()
     yield conn
     conn.close()
 
-    # Cleanup
-    db_path.unlink(missing_ok=True)
-    (db_path.parent / f"{db_path.name}-wal").unlink(missing_ok=True)
-    (db_path.parent / f"{db_path.name}-shm").unlink(missing_ok=True)
-
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def rb5_xml_path():
     """Path to Rekordbox 5 test XML file."""
-    return Path(__file__).parent.parent / "testfiles" / "rb5_database.xml"
+    return _TESTFILES / "rb5_database.xml"
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def rb6_xml_path():
     """Path to Rekordbox 6 test XML file."""
-    return Path(__file__).parent.parent / "testfiles" / "rb6_database.xml"
+    return _TESTFILES / "rb6_database.xml"
 
 
-@pytest.fixture
-def test_audio_dir():
-    """Create temporary directory with test FLAC files (simplest to create validly).
+@pytest.fixture(scope="session")
+def rb5_parsed(rb5_xml_path):
+    """Rekordbox 5 XML parsed once per session (import only reads it)."""
+    return RekordboxXml(str(rb5_xml_path))
+
+
+@pytest.fixture(scope="session")
+def rb6_parsed(rb6_xml_path):
+    """Rekordbox 6 XML parsed once per session (import only reads it)."""
+    return RekordboxXml(str(rb6_xml_path))
+
 
-    FLAC is the simplest format to create with valid metadata for testing.
-    Real audio files are complex to create with minimal code, so we focus on FLAC.
+@pytest.fixture(scope="session")
+def test_audio_dir(tmp_path_factory):
+    """Create temporary directory with test FLAC files, once per session.
+
+    The files are copies of the checked-in testfiles/audio_samples/canonical.flac,
+    so no tags are written at test time. Shared by every test: treat it as read-only.
 
     TODO: Add coverage for remaining formats by downloading real test files:
     - ALAC (.alac) - Apple Lossless Audio Codec
     - AIFF (.aiff, .aif) - Audio Interchange File Format
-    - MP3 (.mp3) - currently created but validation is unreliable
-    - WAV (.wav) - currently created but validation is unreliable
+    - MP3 (.mp3) - MPEG Audio Layer III
+    - WAV (.wav) - Waveform Audio
     - AAC (.aac) - Advanced Audio Coding
     - M4A (.m4a) - MPEG-4 Audio
     - OGG (.ogg) - Ogg Vorbis
@@ -65,201 +139,187 @@ def test_audio_dir():
 
     Steps to implement:
     1. Download or create minimal valid audio files for each format
-    2. Store them in testfiles/audio_samples/ directory
-    3. Create a fixture that copies these files to a temp directory
+    2. Store them in testfiles/audio_samples/ next to canonical.flac
+    3. Copy them into the temp directory below, like the FLAC sample
     4. Add format-specific tests to test_scanner.py
     """
-    temp_dir = Path(tempfile.mkdtemp(prefix="dj_indexer_test_audio_"))
-
-    # Test metadata to apply to all files
-    metadata = {
-        "title": "Test Track",
-        "artist": "Test Artist",
-        "album": "Test Album",
-        "genre": "Test Genre",
-        "bpm": "128",
-        "key": "2A",
-    }
-
-    # Create multiple test files - we'll use FLAC as it's most reliable
-    # In a real scenario, you'd use actual audio files or a test audio library
-    _create_test_flac(temp_dir / "test_track_01.flac", metadata)
-    _create_test_flac(temp_dir / "test_track_02.flac", metadata)
-    _create_test_flac(temp_dir / "test_track_03.flac", metadata)
-
-    yield temp_dir
-
-    # Cleanup
-    shutil.rmtree(temp_dir, ignore_errors=True)
-
-
-def _create_test_mp3(path: Path, metadata: dict):
-    """Create a minimal valid MP3 file with ID3 tags."""
-    # MP3 header for silent frame (approximately 26 bytes)
-    mp3_frame = b"\xFF\xFB\x90\x00" + b"\x00" * 22  # Minimal valid MPEG frame
-    path.write_bytes(mp3_frame * 100)  # Repeat to make it longer
-
-    # Add ID3 tags
-    audio = ID3()
-    audio["TIT2"] = TIT2(text=[metadata["title"]])
-    audio["TPE1"] = TPE1(text=[metadata["artist"]])
-    audio["TALB"] = TALB(text=[metadata["album"]])
-    audio["TCON"] = TCON(text=[metadata["genre"]])
-    audio["TBPM"] = TBPM(text=[metadata["bpm"]])
-    audio["TKEY"] = TKEY(text=[metadata["key"]])
-    audio.save(str(path), v2_version=3)
-
-
-def _create_test_wav(path: Path, metadata: dict):
-    """Create a minimal valid WAV file with ID3 tags."""
-    # Minimal WAV header + RIFF structure
-    wav_header = (
-        b"RIFF"  # ChunkID
-        + b"\x24\x00\x00\x00"  # ChunkSize (36 bytes)
-        + b"WAVE"  # Format
-        + b"fmt "  # Subchunk1ID
-        + b"\x10\x00\x00\x00"  # Subchunk1Size (16 bytes)
-        + b"\x01\x00"  # AudioFormat (1 = PCM)
-        + b"\x01\x00"  # NumChannels (1)
-        + b"\x44\xAC\x00\x00"  # SampleRate (44100 Hz)
-        + b"\x88\x58\x01\x00"  # ByteRate
-        + b"\x02\x00"  # BlockAlign
-        + b"\x10\x00"  # BitsPerSample
-        + b"data"  # Subchunk2ID
-        + b"\x00\x00\x00\x00"  # Subchunk2Size
-    )
-    path.write_bytes(wav_header)
-
-    # Add ID3 tags
-    audio = ID3()
-    audio["TIT2"] = TIT2(text=[metadata["title"]])
-    audio["TPE1"] = TPE1(text=[metadata["artist"]])
-    audio["TALB"] = TALB(text=[metadata["album"]])
-    audio["TCON"] = TCON(text=[metadata["genre"]])
-    audio["TBPM"] = TBPM(text=[metadata["bpm"]])
-    audio["TKEY"] = TKEY(text=[metadata["key"]])
-    audio.save(str(path), v2_version=3)
-
-
-def _create_test_flac(path: Path, metadata: dict):
-    """Create a minimal valid FLAC file with Vorbis comments."""
-    # Minimal FLAC structure (simplified for testing)
-    flac_header = (
-        b"fLaC"  # FLAC signature
-        + b"\x80"  # Metadata block type 0 (STREAMINFO), last block
-        + b"\x00\x00\x22"  # Metadata block length (34 bytes)
-        + b"\x00\x10"  # Min block size
-        + b"\x00\x10"  # Max block size
-        + b"\x00\x00\x00"  # Min frame size
-        + b"\x00\x00\x00"  # Max frame size
-        + b"\xAC\x40"  # Sample rate (44100 Hz)
-        + b"\x01"  # Channels (1)
-        + b"\x08"  # Bits per sample (16)
-        + b"\x00\x00\x00\x00\x00"  # Total samples
-        + b"\x00" * 16  # MD5 signature
-    )
-    path.write_bytes(flac_header)
-
-    # Add Vorbis comments
-    audio = FLAC(str(path))
-    audio["TITLE"] = metadata["title"]
-    audio["ARTIST"] = metadata["artist"]
-    audio["ALBUM"] = metadata["album"]
-    audio["GENRE"] = metadata["genre"]
-    audio["BPM"] = metadata["bpm"]
-    audio["INITIALKEY"] = metadata["key"]
-    audio.save()
-
-
-def _create_test_ogg(path: Path, metadata: dict):
-    """Create a minimal valid OGG Vorbis file."""
-    # Create empty OGG file and add tags
-    path.touch()
-    audio = OggVorbis(str(path))
-    audio["TITLE"] = metadata["title"]
-    audio["ARTIST"] = metadata["artist"]
-    audio["ALBUM"] = metadata["album"]
-    audio["GENRE"] = metadata["genre"]
-    audio["BPM"] = metadata["bpm"]
-    audio["INITIALKEY"] = metadata["key"]
-    audio.save()
-
-
-def _create_test_opus(path: Path, metadata: dict):
-    """Create a minimal valid OGG Opus file."""
-    # Create empty OPUS file and add tags
-    path.touch()
-    audio = OggOpus(str(path))
-    audio["TITLE"] = metadata["title"]
-    audio["ARTIST"] = metadata["artist"]
-    audio["ALBUM"] = metadata["album"]
-    audio["GENRE"] = metadata["genre"]
-    audio["BPM"] = metadata["bpm"]
-    audio["INITIALKEY"] = metadata["key"]
-    audio.save()
+    temp_dir = tmp_path_factory.mktemp("audio")
+    _write_audio_samples(temp_dir)
+    return temp_dir
+
+
+# Pre-tagged sample (TITLE "Test Track", ARTIST "Test Artist", BPM 128, key 2A)
+_CANONICAL_FLAC = _TESTFILES / "audio_samples" / "canonical.flac"
+
+
+def _write_audio_samples(directory: Path):
+    """Place the three FLAC samples used by scanner tests into directory."""
+    for name in ("test_track_01.flac", "test_track_02.flac", "test_track_03.flac"):
+        shutil.copyfile(_CANONICAL_FLAC, directory / name)
 
 
 @pytest.fixture
-def populated_db(test_db):
-    """Create a test database with various tracks, cues, and playlists for search testing."""
-    cursor = test_db.cursor()
-
-    # Insert test tracks with varied metadata
-    test_tracks = [
-        # (filepath, filename, filename_lower, source_label, title, artist, album, genre, bpm, musical_key)
-        ("/usb1/music/track1.mp3", "track1.mp3", "track1.mp3", "USB1", "Electric Dreams", "Bicep", "Isles", "Techno", 128.0, "2A"),
-        ("/usb1/music/track2.mp3", "track2.mp3", "track2.mp3", "USB1", "Glue", "Bicep", "Isles", "Techno", 129.0, "11B"),
-        ("/usb2/dj/ambient.flac", "ambient.flac", "ambient.flac", "USB2", "Ambient Waves", "Jon Hopkins", "Emerald Rush", "Ambient", 110.0, "6D"),
-        ("/usb2/dj/house_track.flac", "house_track.flac", "house_track.flac", "USB2", "House Drop", "Fisher", "Losing It", "House", 124.0, "1D"),
-        ("/external/backup/duplicate.mp3", "duplicate.mp3", "duplicate.mp3", "External", "Duplicate Track", "Unknown Artist", None, "Techno", 130.0, None),
-        ("/external/backup/chill.mp3", "chill.mp3", "chill.mp3", "External", "Chill Vibes", "Jon Hopkins", "Night Vision", "Ambient", 95.0, "8B"),
-    ]
-
-    track_ids = {}
-    for filepath, filename, filename_lower, source_label, title, artist, album, genre, bpm, musical_key in test_tracks:
-        cursor.execute("""
+def tiny_audio_dir(tmp_path):
+    """Directory holding a single FLAC sample, for tests that only need one scan hit."""
+    shutil.copyfile(_CANONICAL_FLAC, tmp_path / "test_track_01.flac")
+    return tmp_path
+
+
+@pytest.fixture(scope="module")
+def scanned_db(test_audio_dir):
+    """Database with test_audio_dir scanned once as "TestLibrary".
+
+    For read-only tests; anything that rescans or updates rows uses test_db.
+    """
+    conn = memory_db()
+    scanner.scan_directory(conn, test_audio_dir, "TestLibrary")
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(scope="module")
+def skewed_bpm_db():
+    """Database of 5000 tracks at 120-129 BPM plus 5 outliers at each end (50s, 250s).
+
+    Big enough that query plans for BPM bounds are meaningful; read-only.
+    """
+    conn = memory_db()
+    bulk = [(120.0 + i % 10, f"bulk{i}", f"Artist {i % 300}") for i in range(5000)]
+    slow = [(50.0 + i, f"slow{i}", f"Slow {i}") for i in range(5)]
+    fast = [(250.0 + i, f"fast{i}", f"Fast {i}") for i in range(5)]
+    insert_tracks(conn, [
+        (f"/m/{name}.mp3", f"{name}.mp3", f"{name}.mp3", "USB1", name, artist,
+         None, bpm, None, ".mp3", 0)
+        for bpm, name, artist in bulk + slow + fast
+    ])
+    db.update_stats(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(params=["mutagen", "tinytag"])
+def tag_reader(request):
+    """Callable ``read(path) -> dict`` of basic tags, parametrized over tag-reading backends.
+
+    Lets read-side tests compare backends before switching the scanner away from
+    mutagen. The tinytag variant is skipped when tinytag is not installed.
+    """
+    if request.param == "tinytag":
+        tinytag = pytest.importorskip("tinytag")
+
+        def read(path: Path) -> dict:
+            tag = tinytag.TinyTag.get(str(path))
+            return {
+                "title": tag.title,
+                "artist": tag.artist,
+                "album": tag.album,
+                "genre": tag.genre,
+            }
+
+        return read
+
+    def read(path: Path) -> dict:
+        audio = mutagen.File(str(path), easy=True)
+        tags = audio.tags or {}
+        return {
+            key: (tags.get(key) or [None])[0]
+            for key in ("title", "artist", "album", "genre")
+        }
+
+    return read
+
+
+# Search fixture data, built once at import and shared by every populated_db
+_TEST_TRACKS = (
+    # (filepath, filename, filename_lower, source_label, title, artist, album, genre, bpm, musical_key, in_rekordbox)
+    ("/usb1/music/track1.mp3", "track1.mp3", "track1.mp3", "USB1", "Electric Dreams", "Bicep", "Isles", "Techno", 128.0, "2A", 1),
+    ("/usb1/music/track2.mp3", "track2.mp3", "track2.mp3", "USB1", "Glue", "Bicep", "Isles", "Techno", 129.0, "11B", 1),
+    ("/usb2/dj/ambient.flac", "ambient.flac", "ambient.flac", "USB2", "Ambient Waves", "Jon Hopkins", "Emerald Rush", "Ambient", 110.0, "6D", 1),
+    ("/usb2/dj/house_track.flac", "house_track.flac", "house_track.flac", "USB2", "House Drop", "Fisher", "Losing It", "House", 124.0, "1D", 1),
+    ("/external/backup/duplicate.mp3", "duplicate.mp3", "duplicate.mp3", "External", "Duplicate Track", "Unknown Artist", None, "Techno", 130.0, None, 1),
+    ("/external/backup/chill.mp3", "chill.mp3", "chill.mp3", "External", "Chill Vibes", "Jon Hopkins", "Night Vision", "Ambient", 95.0, "8B", 1),
+)
+
+_CUES_DATA = (
+    # (filename, cue_type, cue_name, cue_num, position_sec)
+    ("track1.mp3", "memory_cue", "Intro", -1, 0.0),
+    ("track1.mp3", "hot_cue_A", "Drop", 0, 32.5),
+    ("track1.mp3", "hot_cue_B", "Break", 1, 64.0),
+    ("track2.mp3", "memory_cue", "Start", -1, 0.0),
+    ("track2.mp3", "hot_cue_A", "Breakdown", 0, 45.0),
+    ("ambient.flac", "memory_cue", "Peak", -1, 120.0),
+    ("house_track.flac", "hot_cue_A", "Drop", 0, 30.0),
+    ("house_track.flac", "hot_cue_B", "Outro", 1, 240.0),
+    ("chill.mp3", "hot_cue_A", "Verse", 0, 15.0),
+)
+
+_PLAYLISTS_DATA = (
+    # (filename, playlist_name, playlist_path, position)
+    ("track1.mp3", "Techno Bangers", "root/Techno Bangers", 1),
+    ("track2.mp3", "Techno Bangers", "root/Techno Bangers", 2),
+    ("ambient.flac", "Ambient Chill", "root/Ambient/Chill", 1),
+    ("chill.mp3", "Ambient Chill", "root/Ambient/Chill", 2),
+    ("house_track.flac", "House Vibes", "root/Genre/House", 1),
+)
+
+
+@pytest.fixture(scope="session")
+def populated_db():
+    """Shared test database with various tracks, cues, and playlists for search testing.
+
+    Built once per session; _populated_db_savepoint rolls back each test's changes.
+    """
+    conn = memory_db()
+    # One transaction for all seed rows
+    with conn:
+        conn.executemany("""
             INSERT INTO tracks (filepath, filename, filename_lower, source_label, title, artist, album, genre, bpm, musical_key, in_rekordbox)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
-        """, (filepath, filename, filename_lower, source_label, title, artist, album, genre, bpm, musical_key))
-        track_ids[filename] = cursor.lastrowid
-
-    # Insert cue points for some tracks
-    cues_data = [
-        # (track_id_key, cue_type, cue_name, cue_num, position_sec)
-        ("track1.mp3", "memory_cue", "Intro", -1, 0.0),
-        ("track1.mp3", "hot_cue_A", "Drop", 0, 32.5),
-        ("track1.mp3", "hot_cue_B", "Break", 1, 64.0),
-        ("track2.mp3", "memory_cue", "Start", -1, 0.0),
-        ("track2.mp3", "hot_cue_A", "Breakdown", 0, 45.0),
-        ("ambient.flac", "memory_cue", "Peak", -1, 120.0),
-        ("house_track.flac", "hot_cue_A", "Drop", 0, 30.0),
-        ("house_track.flac", "hot_cue_B", "Outro", 1, 240.0),
-        ("chill.mp3", "hot_cue_A", "Verse", 0, 15.0),
-    ]
-
-    for track_id_key, cue_type, cue_name, cue_num, position_sec in cues_data:
-        track_id = track_ids[track_id_key]
-        cursor.execute("""
-            INSERT INTO cue_points (track_id, cue_type, cue_name, cue_num, position_sec)
-            VALUES (?, ?, ?, ?, ?)
-        """, (track_id, cue_type, cue_name, cue_num, position_sec))
-
-    # Insert playlists
-    playlists_data = [
-        # (playlist_name, playlist_path, track_id_key, position)
-        ("Techno Bangers", "root/Techno Bangers", "track1.mp3", 1),
-        ("Techno Bangers", "root/Techno Bangers", "track2.mp3", 2),
-        ("Ambient Chill", "root/Ambient/Chill", "ambient.flac", 1),
-        ("Ambient Chill", "root/Ambient/Chill", "chill.mp3", 2),
-        ("House Vibes", "root/Genre/House", "house_track.flac", 1),
-    ]
-
-    for playlist_name, playlist_path, track_id_key, position in playlists_data:
-        track_id = track_ids[track_id_key]
-        cursor.execute("""
-            INSERT INTO playlists (playlist_name, playlist_path, track_id, position)
-            VALUES (?, ?, ?, ?)
-        """, (playlist_name, playlist_path, track_id, position))
-
-    test_db.commit()
-    return test_db
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, _TEST_TRACKS)
+        _insert_joined(
+            conn,
+            "cue_points (track_id, cue_type, cue_name, cue_num, position_sec)",
+            ("cue_type", "cue_name", "cue_num", "position_sec"),
+            _CUES_DATA,
+        )
+        _insert_joined(
+            conn,
+            "playlists (track_id, playlist_name, playlist_path, position)",
+            ("playlist_name", "playlist_path", "position"),
+            _PLAYLISTS_DATA,
+        )
+
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(autouse=True)
+def _populated_db_savepoint(request):
+    """Wrap each test using populated_db in a SAVEPOINT and roll it back afterwards."""
+    if "populated_db" not in request.fixturenames:
+        yield
+        return
+
+    conn = request.getfixturevalue("populated_db")
+    conn.execute("SAVEPOINT populated_db_test")
+    yield
+    # A commit would end the savepoint and leak rows into every later test
+    assert conn.in_transaction, "test committed on session-scoped populated_db"
+    conn.execute("ROLLBACK TO populated_db_test")
+    conn.execute("RELEASE populated_db_test")
+
+
+def _insert_joined(conn, target: str, columns: tuple, rows):
+    """Insert rows keyed by filename, resolving track_id with one INSERT ... SELECT.
+
+    Each row is (filename, *values); the filename is joined against tracks.filename
+    inside SQLite instead of looking up ids in Python.
+    """
+    placeholders = "(" + ", ".join("?" * (len(columns) + 1)) + ")"
+    values_sql = ", ".join([placeholders] * len(rows))
+    conn.execute(f"""
+        WITH v(filename, {", ".join(columns)}) AS (VALUES {values_sql})
+        INSERT INTO {target}
+        SELECT t.id, {", ".join("v." + c for c in columns)}
+        FROM v JOIN tracks t ON t.filename = v.filename
+    """, [value for row in rows for value in row])
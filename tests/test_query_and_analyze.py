@@ -1,409 +1,254 @@
 """Tests for query and analyze modules."""
 
+import argparse
+import functools
 import io
-import tempfile
-from contextlib import redirect_stdout
-from pathlib import Path
+import re
 
 import pytest
 
 from dj_indexer import query, analyze
-import argparse
+
+
+# run_query's rejection message, compiled once for pytest.raises(match=...)
+_ONLY_SELECT_RE = re.compile("Only SELECT statements are supported")
+
+# Analyze arguments: folder analysis, no filters
+_ARGS_BASE = argparse.Namespace(
+    folders=True,
+    in_rekordbox=False, not_in_rekordbox=False,
+    source=None, format=None, genre=None,
+    bpm_min=None, bpm_max=None,
+    limit=100,
+)
+
+
+def _contains_all(text, *needles):
+    """True if every needle occurs in text."""
+    return all(needle in text for needle in needles)
+
+
+@functools.lru_cache(maxsize=None)
+def _alternation(needles):
+    """Compiled regex matching any of the literal needles."""
+    return re.compile("|".join(map(re.escape, needles)))
+
+
+def _any_in(text, *needles):
+    """True if at least one needle occurs in text (single regex pass)."""
+    return _alternation(needles).search(text) is not None
+
+
+def _args(**overrides):
+    """Copy of _ARGS_BASE with the given attributes overridden."""
+    return argparse.Namespace(**{**vars(_ARGS_BASE), **overrides})
 
 
 class TestQueryCommand:
     """Test raw SQL query execution."""
 
-    def test_query_simple_select(self, populated_db):
-        """Execute a simple SELECT query."""
-        output = io.StringIO()
-        with redirect_stdout(output):
-            query.run_query(populated_db, "SELECT COUNT(*) as total FROM tracks")
+    @pytest.mark.parametrize("sql", [
+        "SELECT COUNT(*) as total FROM tracks",
+        "select COUNT(*) from tracks",
+        "  \n  SELECT COUNT(*) FROM tracks  \n  ",
+    ], ids=["simple", "lowercase", "whitespace"])
+    def test_query_count_variants(self, populated_db, capsys, sql):
+        """SELECT is accepted regardless of case and surrounding whitespace."""
+        query.run_query(populated_db, sql)
 
-        result = output.getvalue()
-        assert "total" in result
-        assert "6" in result
-        assert "(1 row)" in result
+        result = capsys.readouterr().out
+        assert _contains_all(result, "6", "(1 row)")
+
+    def test_query_writes_to_file(self, populated_db, capsys):
+        """Output goes to the given file instead of stdout."""
+        buf = io.StringIO()
+        query.run_query(populated_db, "SELECT COUNT(*) as total FROM tracks", file=buf)
 
-    def test_query_with_column_headers(self, populated_db):
+        assert _contains_all(buf.getvalue(), "total", "(1 row)")
+        assert capsys.readouterr().out == ""
+
+    def test_query_with_column_headers(self, populated_db, capsys):
         """Query returns properly formatted column headers."""
-        output = io.StringIO()
-        with redirect_stdout(output):
-            query.run_query(populated_db, "SELECT artist, title FROM tracks LIMIT 2")
+        query.run_query(populated_db, "SELECT artist, title FROM tracks LIMIT 2")
 
-        result = output.getvalue()
+        result = capsys.readouterr().out
         assert "artist" in result
         assert "title" in result
 
-    def test_query_with_where_clause(self, populated_db):
+    def test_query_with_where_clause(self, populated_db, capsys):
         """Execute query with WHERE clause."""
-        output = io.StringIO()
-        with redirect_stdout(output):
-            query.run_query(populated_db, "SELECT title FROM tracks WHERE bpm >= 120")
+        query.run_query(populated_db, "SELECT title FROM tracks WHERE bpm >= 120")
 
-        result = output.getvalue()
+        result = capsys.readouterr().out
         # Should find the tracks with high BPM (128, 129, 124, 130)
-        assert "Electric Dreams" in result or "Glue" in result or "House Drop" in result
+        assert _any_in(result, "Electric Dreams", "Glue", "House Drop")
         assert "(4 rows)" in result
 
-    def test_query_with_aggregation(self, populated_db):
+    def test_query_with_aggregation(self, populated_db, capsys):
         """Execute query with GROUP BY and aggregation."""
-        output = io.StringIO()
-        with redirect_stdout(output):
-            query.run_query(populated_db, "SELECT source_label, COUNT(*) as count FROM tracks GROUP BY source_label")
+        query.run_query(populated_db, "SELECT source_label, COUNT(*) as count FROM tracks GROUP BY source_label")
 
-        result = output.getvalue()
-        assert "source_label" in result
-        assert "count" in result
-        assert "USB1" in result
-        assert "USB2" in result
+        result = capsys.readouterr().out
+        assert _contains_all(result, "source_label", "count", "USB1", "USB2")
 
-    def test_query_with_dirname(self, populated_db):
+    def test_query_with_dirname(self, populated_db, capsys):
         """Query can use DIRNAME function."""
-        output = io.StringIO()
-        with redirect_stdout(output):
-            query.run_query(populated_db, "SELECT DIRNAME(filepath) as folder, COUNT(*) as n FROM tracks GROUP BY DIRNAME(filepath) ORDER BY n DESC")
+        query.run_query(populated_db, "SELECT DIRNAME(filepath) as folder, COUNT(*) as n FROM tracks GROUP BY DIRNAME(filepath) ORDER BY n DESC")
 
-        result = output.getvalue()
+        result = capsys.readouterr().out
         assert "folder" in result
         assert "n" in result
         # Check for folder paths (will vary based on OS path format)
         assert ("/usb" in result or "usb" in result) and "2" in result  # At least 2 folders with track counts
 
-    def test_query_with_null_values(self, populated_db):
+    def test_query_with_regexp(self, populated_db, capsys):
+        """REGEXP is available in queries without any prior search call."""
+        query.run_query(populated_db, "SELECT title FROM tracks WHERE REGEXP('^glue$', title)")
+
+        result = capsys.readouterr().out
+        assert "Glue" in result
+        assert "(1 row)" in result
+
+    def test_query_with_null_values(self, populated_db, capsys):
         """Query properly handles NULL values."""
-        output = io.StringIO()
-        with redirect_stdout(output):
-            query.run_query(populated_db, "SELECT artist, album FROM tracks WHERE album IS NULL")
+        query.run_query(populated_db, "SELECT artist, album FROM tracks WHERE album IS NULL")
 
-        result = output.getvalue()
+        result = capsys.readouterr().out
         assert "NULL" in result
 
-    def test_query_with_float_formatting(self, populated_db):
+    def test_query_with_float_formatting(self, populated_db, capsys):
         """Query formats float values properly."""
-        output = io.StringIO()
-        with redirect_stdout(output):
-            query.run_query(populated_db, "SELECT AVG(bpm) as avg_bpm FROM tracks WHERE bpm > 0")
+        query.run_query(populated_db, "SELECT AVG(bpm) as avg_bpm FROM tracks WHERE bpm > 0")
 
-        result = output.getvalue()
+        result = capsys.readouterr().out
         assert "avg_bpm" in result
         # Should have a numeric value
-        lines = result.strip().split('\n')
+        lines = result.splitlines()
         assert len(lines) >= 4  # header, separator, data, count
 
-    def test_query_no_results(self, populated_db):
+    def test_query_no_results(self, populated_db, capsys):
         """Query with no results shows empty result set."""
-        output = io.StringIO()
-        with redirect_stdout(output):
-            query.run_query(populated_db, "SELECT title FROM tracks WHERE title = 'NonexistentTrack'")
+        query.run_query(populated_db, "SELECT title FROM tracks WHERE title = 'NonexistentTrack'")
 
-        result = output.getvalue()
+        result = capsys.readouterr().out
         # Should show 0 rows
         assert "(0 rows)" in result
         assert "title" in result  # Should still show column header
 
-    def test_query_rejects_non_select(self, populated_db):
-        """Query rejects non-SELECT statements."""
-        with pytest.raises(ValueError, match="Only SELECT statements are supported"):
-            query.run_query(populated_db, "INSERT INTO tracks VALUES ()")
-
-    def test_query_rejects_update(self, populated_db):
-        """Query rejects UPDATE statements."""
-        with pytest.raises(ValueError, match="Only SELECT statements are supported"):
-            query.run_query(populated_db, "UPDATE tracks SET artist = 'New'")
-
-    def test_query_rejects_delete(self, populated_db):
-        """Query rejects DELETE statements."""
-        with pytest.raises(ValueError, match="Only SELECT statements are supported"):
-            query.run_query(populated_db, "DELETE FROM tracks")
-
-    def test_query_rejects_drop(self, populated_db):
-        """Query rejects DROP statements."""
-        with pytest.raises(ValueError, match="Only SELECT statements are supported"):
-            query.run_query(populated_db, "DROP TABLE tracks")
-
-    def test_query_sql_error_handling(self, populated_db):
+    @pytest.mark.parametrize("sql", [
+        "INSERT INTO tracks VALUES ()",
+        "UPDATE tracks SET artist = 'New'",
+        "DELETE FROM tracks",
+        "DROP TABLE tracks",
+        "SELECTED FROM tracks",
+    ], ids=["insert", "update", "delete", "drop", "select_prefixed_word"])
+    def test_query_rejects(self, sql):
+        """Query rejects anything but a SELECT before touching the connection."""
+        with pytest.raises(ValueError, match=_ONLY_SELECT_RE):
+            query.run_query(None, sql)
+
+    def test_query_sql_error_handling(self, populated_db, capsys):
         """Query handles SQL errors gracefully."""
-        output = io.StringIO()
-        with redirect_stdout(output):
-            query.run_query(populated_db, "SELECT * FROM nonexistent_table")
+        query.run_query(populated_db, "SELECT * FROM nonexistent_table")
 
-        result = output.getvalue()
+        result = capsys.readouterr().out
         assert "SQL Error" in result
 
-    def test_query_with_order_by(self, populated_db):
+    def test_query_with_order_by(self, populated_db, capsys):
         """Query can use ORDER BY."""
-        output = io.StringIO()
-        with redirect_stdout(output):
-            query.run_query(populated_db, "SELECT title, bpm FROM tracks WHERE bpm > 0 ORDER BY bpm DESC LIMIT 3")
+        query.run_query(populated_db, "SELECT title, bpm FROM tracks WHERE bpm > 0 ORDER BY bpm DESC LIMIT 3")
 
-        result = output.getvalue()
+        result = capsys.readouterr().out
         assert "title" in result
         assert "bpm" in result
 
-    def test_query_case_insensitive_validation(self, populated_db):
-        """Query validation is case-insensitive for SELECT."""
-        output = io.StringIO()
-        with redirect_stdout(output):
-            query.run_query(populated_db, "select COUNT(*) from tracks")
-
-        result = output.getvalue()
-        assert "(1 row)" in result
-
-    def test_query_with_whitespace(self, populated_db):
-        """Query handles leading/trailing whitespace."""
-        output = io.StringIO()
-        with redirect_stdout(output):
-            query.run_query(populated_db, "  \n  SELECT COUNT(*) FROM tracks  \n  ")
-
-        result = output.getvalue()
-        assert "(1 row)" in result
-
 
 class TestAnalyzeCommand:
     """Test pre-built analytics breakdowns."""
 
-    def test_analyze_folders_basic(self, populated_db):
+    def test_analyze_folders_basic(self, populated_db, capsys):
         """Analyze by folder shows folder breakdown."""
-        args = argparse.Namespace(
-            folders=True,
-            in_rekordbox=False, not_in_rekordbox=False,
-            source=None, format=None, genre=None,
-            bpm_min=None, bpm_max=None,
-            limit=100
-        )
-        output = io.StringIO()
-        with redirect_stdout(output):
-            analyze.analyze(populated_db, args)
-
-        result = output.getvalue()
+        args = _args()
+        analyze.analyze(populated_db, args)
+
+        result = capsys.readouterr().out
         assert "Folder Analysis" in result
         assert "unique folders" in result
         assert "/usb1/music" in result or "usb1" in result
         assert "/usb2/dj" in result or "usb2" in result
 
-    def test_analyze_folders_with_in_rekordbox_filter(self, populated_db):
-        """Analyze shows filter description in title."""
-        args = argparse.Namespace(
-            folders=True,
-            in_rekordbox=True, not_in_rekordbox=False,
-            source=None, format=None, genre=None,
-            bpm_min=None, bpm_max=None,
-            limit=100
-        )
-        output = io.StringIO()
-        with redirect_stdout(output):
-            analyze.analyze(populated_db, args)
-
-        result = output.getvalue()
-        assert "in rekordbox" in result
-
-    def test_analyze_folders_with_source_filter(self, populated_db):
-        """Analyze filters by source label."""
-        args = argparse.Namespace(
-            folders=True,
-            in_rekordbox=False, not_in_rekordbox=False,
-            source="USB1", format=None, genre=None,
-            bpm_min=None, bpm_max=None,
-            limit=100
-        )
-        output = io.StringIO()
-        with redirect_stdout(output):
-            analyze.analyze(populated_db, args)
-
-        result = output.getvalue()
-        assert "source=USB1" in result
-        assert "/usb1/music" in result or "usb1" in result
-
-    def test_analyze_folders_with_bpm_min(self, populated_db):
-        """Analyze filters by minimum BPM."""
-        args = argparse.Namespace(
-            folders=True,
-            in_rekordbox=False, not_in_rekordbox=False,
-            source=None, format=None, genre=None,
-            bpm_min=120.0, bpm_max=None,
-            limit=100
-        )
-        output = io.StringIO()
-        with redirect_stdout(output):
-            analyze.analyze(populated_db, args)
-
-        result = output.getvalue()
-        assert "bpm=120.0" in result
-        # Should filter to higher BPM tracks
-
-    def test_analyze_folders_with_bpm_range(self, populated_db):
-        """Analyze filters by BPM range."""
-        args = argparse.Namespace(
-            folders=True,
-            in_rekordbox=False, not_in_rekordbox=False,
-            source=None, format=None, genre=None,
-            bpm_min=100.0, bpm_max=130.0,
-            limit=100
-        )
-        output = io.StringIO()
-        with redirect_stdout(output):
-            analyze.analyze(populated_db, args)
-
-        result = output.getvalue()
-        assert "bpm=100.0-130.0" in result
-
-    def test_analyze_folders_with_genre_filter(self, populated_db):
-        """Analyze filters by genre."""
-        args = argparse.Namespace(
-            folders=True,
-            in_rekordbox=False, not_in_rekordbox=False,
-            source=None, format=None, genre="Techno",
-            bpm_min=None, bpm_max=None,
-            limit=100
-        )
-        output = io.StringIO()
-        with redirect_stdout(output):
-            analyze.analyze(populated_db, args)
-
-        result = output.getvalue()
-        assert "genre=Techno" in result
-
-    def test_analyze_folders_with_format_filter(self, populated_db):
-        """Analyze filters by file format."""
-        args = argparse.Namespace(
-            folders=True,
-            in_rekordbox=False, not_in_rekordbox=False,
-            source=None, format=".mp3", genre=None,
-            bpm_min=None, bpm_max=None,
-            limit=100
-        )
-        output = io.StringIO()
-        with redirect_stdout(output):
-            analyze.analyze(populated_db, args)
-
-        result = output.getvalue()
-        # Test data doesn't have file_format set, so this should show no results
-        assert "format=.mp3" in result or "No folders found" in result
-
-    def test_analyze_folders_with_not_in_rekordbox(self, populated_db):
-        """Analyze shows not_in_rekordbox filter in title even with no results."""
-        args = argparse.Namespace(
-            folders=True,
-            in_rekordbox=False, not_in_rekordbox=True,
-            source=None, format=None, genre=None,
-            bpm_min=None, bpm_max=None,
-            limit=100
-        )
-        output = io.StringIO()
-        with redirect_stdout(output):
-            analyze.analyze(populated_db, args)
-
-        result = output.getvalue()
-        # Test data has all tracks with in_rekordbox=1, so no results expected
-        # But the filter description should still be in title when results exist
-        assert "not in rekordbox" in result or "No folders found" in result
-
-    def test_analyze_folders_no_results(self, populated_db):
-        """Analyze shows message when no results match filters."""
-        args = argparse.Namespace(
-            folders=True,
-            in_rekordbox=False, not_in_rekordbox=False,
-            source=None, format=".wav", genre=None,  # No WAV files in test data
-            bpm_min=None, bpm_max=None,
-            limit=100
-        )
-        output = io.StringIO()
-        with redirect_stdout(output):
-            analyze.analyze(populated_db, args)
-
-        result = output.getvalue()
-        assert "No folders found matching criteria" in result
-
-    def test_analyze_folders_track_count(self, populated_db):
+    @pytest.mark.parametrize("overrides,expected", [
+        ({"in_rekordbox": True}, ["in rekordbox"]),
+        ({"source": "USB1"}, ["source=USB1", "usb1"]),
+        ({"bpm_min": 120.0}, ["bpm=120.0"]),
+        ({"bpm_min": 100.0, "bpm_max": 130.0}, ["bpm=100.0-130.0"]),
+        ({"genre": "Techno"}, ["genre=Techno"]),
+        # Test data has no file_format and every track is in rekordbox
+        ({"format": ".mp3"}, ["No folders found matching criteria"]),
+        ({"not_in_rekordbox": True}, ["No folders found matching criteria"]),
+        ({"format": ".wav"}, ["No folders found matching criteria"]),
+        (
+            {"in_rekordbox": True, "source": "USB1", "genre": "Techno", "bpm_min": 120.0},
+            ["in rekordbox", "source=USB1", "genre=Techno", "bpm=120.0"],
+        ),
+    ], ids=[
+        "in_rekordbox", "source", "bpm_min", "bpm_range", "genre",
+        "format", "not_in_rekordbox", "no_results", "multiple_filters",
+    ])
+    def test_analyze_folders_filters(self, populated_db, capsys, overrides, expected):
+        """Analyze applies filters and describes them in the title."""
+        analyze.analyze(populated_db, _args(**overrides))
+
+        result = capsys.readouterr().out
+        assert _contains_all(result, *expected)
+
+    def test_analyze_folders_track_count(self, populated_db, capsys):
         """Analyze shows correct track counts per folder."""
-        args = argparse.Namespace(
-            folders=True,
-            in_rekordbox=False, not_in_rekordbox=False,
-            source="USB1", format=None, genre=None,
-            bpm_min=None, bpm_max=None,
-            limit=100
-        )
-        output = io.StringIO()
-        with redirect_stdout(output):
-            analyze.analyze(populated_db, args)
-
-        result = output.getvalue()
+        args = _args(source="USB1")
+        analyze.analyze(populated_db, args)
+
+        result = capsys.readouterr().out
         # USB1 has 2 tracks in the test data
         assert "2 track" in result
 
-    def test_analyze_folders_respects_limit(self, populated_db):
+    def test_analyze_folders_respects_limit(self, populated_db, capsys):
         """Analyze respects the limit parameter."""
-        args = argparse.Namespace(
-            folders=True,
-            in_rekordbox=False, not_in_rekordbox=False,
-            source=None, format=None, genre=None,
-            bpm_min=None, bpm_max=None,
-            limit=1
-        )
-        output = io.StringIO()
-        with redirect_stdout(output):
-            analyze.analyze(populated_db, args)
-
-        result = output.getvalue()
+        args = _args(limit=1)
+        analyze.analyze(populated_db, args)
+
+        result = capsys.readouterr().out
         # Should show only top folder by count
-        lines = result.strip().split('\n')
-        folder_lines = [l for l in lines if l.strip() and not "Folder Analysis" in l and not "---" in l]
+        skip = ("Folder Analysis", "---")
+        folder_lines = [
+            line for line in result.splitlines()
+            if line.strip() and not any(marker in line for marker in skip)
+        ]
         # Only one folder should be shown due to limit
-        assert len([l for l in folder_lines if "/usb" in l.lower() or "usb" in l.lower()]) <= 1
+        assert len([line for line in folder_lines if "usb" in line.lower()]) <= 1
 
-    def test_analyze_no_analysis_type(self, populated_db):
+    def test_analyze_writes_to_file(self, populated_db, capsys):
+        """Output goes to the given file instead of stdout."""
+        buf = io.StringIO()
+        analyze.analyze(populated_db, _ARGS_BASE, file=buf)
+
+        assert "Folder Analysis" in buf.getvalue()
+        assert capsys.readouterr().out == ""
+
+    def test_analyze_no_analysis_type(self, populated_db, capsys):
         """Analyze shows message when no analysis type is specified."""
-        args = argparse.Namespace(
-            folders=False,
-            in_rekordbox=False, not_in_rekordbox=False,
-            source=None, format=None, genre=None,
-            bpm_min=None, bpm_max=None,
-            limit=100
-        )
-        output = io.StringIO()
-        with redirect_stdout(output):
-            analyze.analyze(populated_db, args)
-
-        result = output.getvalue()
+        args = _args(folders=False)
+        analyze.analyze(populated_db, args)
+
+        result = capsys.readouterr().out
         assert "No analysis type specified" in result
 
-    def test_analyze_folders_multiple_filters(self, populated_db):
-        """Analyze with multiple filters applied."""
-        # Use filters that will have some results
-        args = argparse.Namespace(
-            folders=True,
-            in_rekordbox=True, not_in_rekordbox=False,
-            source="USB1", format=None, genre="Techno",
-            bpm_min=120.0, bpm_max=None,
-            limit=100
-        )
-        output = io.StringIO()
-        with redirect_stdout(output):
-            analyze.analyze(populated_db, args)
-
-        result = output.getvalue()
-        # Should show all applied filters in the output
-        assert "in rekordbox" in result
-        assert "source=USB1" in result
-        assert "genre=Techno" in result
-        assert "bpm=120.0" in result
-
-    def test_analyze_folders_singular_track(self, populated_db):
+    def test_analyze_folders_singular_track(self, populated_db, capsys):
         """Analyze shows 'track' (singular) for 1 track."""
         # This is harder to test without modifying data, but we can verify the logic
         # by checking if the output uses proper grammar
-        args = argparse.Namespace(
-            folders=True,
-            in_rekordbox=False, not_in_rekordbox=False,
-            source=None, format=None, genre="Ambient",  # Only 2 ambient tracks
-            bpm_min=None, bpm_max=None,
-            limit=100
-        )
-        output = io.StringIO()
-        with redirect_stdout(output):
-            analyze.analyze(populated_db, args)
-
-        result = output.getvalue()
+        args = _args(genre="Ambient")
+        analyze.analyze(populated_db, args)
+
+        result = capsys.readouterr().out
         # Should contain proper plural/singular usage
         assert "track" in result or "Track" in result
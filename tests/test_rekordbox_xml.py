@@ -6,6 +6,26 @@ import pytest
 
 from dj_indexer import rekordbox_xml
 
+from .conftest import memory_db
+
+
+@pytest.fixture(scope="module")
+def rb5_db(rb5_parsed):
+    """Database with the rb5 XML imported once per module; read-only."""
+    conn = memory_db()
+    rekordbox_xml.import_parsed_xml(conn, rb5_parsed)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(scope="module")
+def rb6_db(rb6_parsed):
+    """Database with the rb6 XML imported once per module; read-only."""
+    conn = memory_db()
+    rekordbox_xml.import_parsed_xml(conn, rb6_parsed)
+    yield conn
+    conn.close()
+
 
 class TestRekordboxXMLImport:
     """Test XML import with official pyrekordbox test files."""
@@ -23,12 +43,10 @@ class TestRekordboxXMLImport:
         count = cursor.fetchone()[0]
         assert count == 6, f"Expected 6 tracks, got {count}"
 
-    def test_rb5_xml_import_track_metadata(self, test_db, rb5_xml_path):
+    def test_rb5_xml_import_track_metadata(self, rb5_db):
         """Test that track metadata is imported correctly."""
-        rekordbox_xml.import_xml(test_db, rb5_xml_path)
-
         # Check for Demo Track 1
-        cursor = test_db.execute(
+        cursor = rb5_db.execute(
             "SELECT title, artist, bpm, label FROM tracks WHERE title = 'Demo Track 1'"
         )
         row = cursor.fetchone()
@@ -38,12 +56,10 @@ class TestRekordboxXMLImport:
         assert bpm == 128.0, f"Expected BPM 128.0, got {bpm}"
         assert label == "Loopmasters", f"Expected label 'Loopmasters', got {label}"
 
-    def test_rb5_xml_import_cue_points(self, test_db, rb5_xml_path):
+    def test_rb5_xml_import_cue_points(self, rb5_db):
         """Test that cue points are imported correctly."""
-        rekordbox_xml.import_xml(test_db, rb5_xml_path)
-
         # Demo Track 1 has 4 memory cues
-        cursor = test_db.execute(
+        cursor = rb5_db.execute(
             """
             SELECT COUNT(*) FROM cue_points
             WHERE track_id = (SELECT id FROM tracks WHERE title = 'Demo Track 1')
@@ -52,12 +68,10 @@ class TestRekordboxXMLImport:
         count = cursor.fetchone()[0]
         assert count == 4, f"Expected 4 cue points for Demo Track 1, got {count}"
 
-    def test_rb5_xml_import_cue_positions(self, test_db, rb5_xml_path):
+    def test_rb5_xml_import_cue_positions(self, rb5_db):
         """Test that cue point positions are accurate."""
-        rekordbox_xml.import_xml(test_db, rb5_xml_path)
-
         # Check first cue point position (should be 0.025 seconds)
-        cursor = test_db.execute(
+        cursor = rb5_db.execute(
             """
             SELECT position_sec FROM cue_points
             WHERE track_id = (SELECT id FROM tracks WHERE title = 'Demo Track 1')
@@ -70,13 +84,11 @@ class TestRekordboxXMLImport:
         position = row[0]
         assert abs(position - 0.025) < 0.001, f"Expected position ~0.025, got {position}"
 
-    def test_rb5_xml_import_playlists(self, test_db, rb5_xml_path):
+    def test_rb5_xml_import_playlists(self, rb5_db):
         """Test that playlists are imported correctly."""
-        rekordbox_xml.import_xml(test_db, rb5_xml_path)
-
         # RB5 has 2 playlists: "Sub Playlist" and "Playlist1"
         # Each should have 2 tracks (Demo Track 1 and Demo Track 2)
-        cursor = test_db.execute(
+        cursor = rb5_db.execute(
             """
             SELECT COUNT(DISTINCT playlist_name) FROM playlists
             """
@@ -85,7 +97,7 @@ class TestRekordboxXMLImport:
         assert count == 2, f"Expected 2 playlists, got {count}"
 
         # Check that each playlist has 2 tracks
-        cursor = test_db.execute(
+        cursor = rb5_db.execute(
             """
             SELECT playlist_name, COUNT(*) as track_count
             FROM playlists
@@ -112,12 +124,10 @@ class TestRekordboxXMLImport:
         count = cursor.fetchone()[0]
         assert count == 6, f"Expected 6 tracks, got {count}"
 
-    def test_rb6_xml_import_tonality(self, test_db, rb6_xml_path):
+    def test_rb6_xml_import_tonality(self, rb6_db):
         """Test that Rekordbox 6 tonality (musical_key) is imported."""
-        rekordbox_xml.import_xml(test_db, rb6_xml_path)
-
         # RB6 Demo Track 1 has Tonality="Fm"
-        cursor = test_db.execute(
+        cursor = rb6_db.execute(
             "SELECT musical_key FROM tracks WHERE title = 'Demo Track 1'"
         )
         row = cursor.fetchone()
@@ -125,7 +135,7 @@ class TestRekordboxXMLImport:
         musical_key = row[0]
         assert musical_key == "Fm", f"Expected musical_key 'Fm', got {musical_key}"
 
-    def test_rb5_xml_filename_lower_matching(self, test_db, rb5_xml_path):
+    def test_rb5_xml_filename_lower_matching(self, test_db, rb5_parsed):
         """Test that filename matching works via filename_lower."""
         # First insert a track via scanner with a filename
         # Then import XML and verify it matches via filename_lower
@@ -146,7 +156,7 @@ class TestRekordboxXMLImport:
         test_db.commit()
 
         # Import XML with different path format
-        rekordbox_xml.import_xml(test_db, rb5_xml_path)
+        rekordbox_xml.import_parsed_xml(test_db, rb5_parsed)
 
         # Verify the track was updated with rekordbox data
         cursor = test_db.execute(
@@ -162,18 +172,29 @@ class TestRekordboxXMLImport:
         assert artist == "Loopmasters", f"Expected artist 'Loopmasters', got {artist}"
         assert in_rekordbox == 1, f"Expected in_rekordbox=1, got {in_rekordbox}"
 
+    def test_import_parsed_xml_leaves_tree_unchanged(self, test_db, rb5_parsed):
+        """Importing must not mutate the session-shared parsed XML."""
+        before = rb5_parsed.tostring()
+
+        rekordbox_xml.import_parsed_xml(test_db, rb5_parsed)
+
+        assert rb5_parsed.tostring() == before
+
+    def test_rb5_xml_import_updates_planner_stats(self, rb5_db):
+        """Import finishes with ANALYZE, so the planner has per-index statistics."""
+        indexed = {row[0] for row in rb5_db.execute("SELECT idx FROM sqlite_stat1 WHERE tbl = 'tracks'")}
+        assert "idx_tracks_bpm" in indexed
+
     def test_rb5_xml_nonexistent_file(self, test_db):
         """Test error handling for nonexistent XML file."""
         nonexistent = Path("/nonexistent/path/database.xml")
         with pytest.raises(FileNotFoundError):
             rekordbox_xml.import_xml(test_db, nonexistent)
 
-    def test_rb5_xml_import_comments(self, test_db, rb5_xml_path):
+    def test_rb5_xml_import_comments(self, rb5_db):
         """Test that Comments field is imported."""
-        rekordbox_xml.import_xml(test_db, rb5_xml_path)
-
         # Demo Track 1 has Comments="Tracks by www.loopmasters.com"
-        cursor = test_db.execute(
+        cursor = rb5_db.execute(
             "SELECT comments FROM tracks WHERE title = 'Demo Track 1'"
         )
         row = cursor.fetchone()
@@ -17,34 +17,53 @@ for most formats). To add format testing:
 See conftest.py test_audio_dir fixture for detailed TODO.
 """
 
+import os
+import shutil
+import sqlite3
+import time
+from collections import namedtuple
+from pathlib import Path
+
 import pytest
 
 from dj_indexer import scanner
 
+from .conftest import insert_tracks, memory_db
+
+
+_SampleRow = namedtuple(
+    "_SampleRow",
+    "filename filename_lower filepath source_label file_format duration_sec",
+)
+
+
+@pytest.fixture(scope="module")
+def sample_row(scanned_db):
+    """One scanned track's per-file columns, fetched once for the column tests."""
+    row = scanned_db.execute(
+        f"SELECT {', '.join(_SampleRow._fields)} FROM tracks LIMIT 1"
+    ).fetchone()
+    assert row is not None
+    return _SampleRow(*row)
+
 
 class TestScannerBasic:
     """Test basic scanner functionality."""
 
-    def test_scanner_counts_files(self, test_db, test_audio_dir):
-        """Test that scanner finds and imports all audio files."""
-        scanner.scan_directory(test_db, test_audio_dir, "TestLibrary")
-
-        # Query track count (fixture creates 3 FLAC test files)
-        cursor = test_db.execute("SELECT COUNT(*) FROM tracks")
-        count = cursor.fetchone()[0]
+    def test_scanner_counts_files(self, scanned_db):
+        """Test that scanner finds and imports all audio files (fixture creates 3 FLACs)."""
+        count = scanned_db.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
         assert count == 3, f"Expected 3 tracks, got {count}"
 
-    def test_scanner_imports_metadata(self, test_db, test_audio_dir):
+    def test_scanner_imports_metadata(self, scanned_db):
         """Test that scanner imports files and stores them in database."""
-        scanner.scan_directory(test_db, test_audio_dir, "TestLibrary")
-
         # Verify all 3 test files were imported
-        cursor = test_db.execute("SELECT COUNT(*) FROM tracks")
+        cursor = scanned_db.execute("SELECT COUNT(*) FROM tracks")
         count = cursor.fetchone()[0]
         assert count == 3, f"Expected 3 tracks, got {count}"
 
         # Verify each track has basic fields populated
-        cursor = test_db.execute(
+        cursor = scanned_db.execute(
             "SELECT filename, filepath, source_label FROM tracks ORDER BY filename"
         )
         rows = cursor.fetchall()
@@ -54,27 +73,15 @@ class TestScannerBasic:
             assert filepath is not None
             assert source_label == "TestLibrary"
 
-    def test_scanner_imports_metadata_fields(self, test_db, test_audio_dir):
+    def test_scanner_imports_metadata_fields(self, sample_row):
         """Test that scanner populates all expected database fields."""
-        scanner.scan_directory(test_db, test_audio_dir, "TestLibrary")
+        assert sample_row.filename is not None
+        assert sample_row.source_label == "TestLibrary"
+        assert sample_row.file_format == ".flac"
 
-        # Verify all expected columns exist and have data
-        cursor = test_db.execute(
-            """
-            SELECT filename, source_label, file_format, duration_sec
-            FROM tracks LIMIT 1
-            """
-        )
-        row = cursor.fetchone()
-        assert row is not None
-        filename, source_label, file_format, duration_sec = row
-        assert filename is not None
-        assert source_label == "TestLibrary"
-        assert file_format == ".flac"
-
-    def test_scanner_stores_source_label(self, test_db, test_audio_dir):
+    def test_scanner_stores_source_label(self, test_db, tiny_audio_dir):
         """Test that source label is stored correctly."""
-        scanner.scan_directory(test_db, test_audio_dir, "USB1-Main")
+        scanner.scan_directory(test_db, tiny_audio_dir, "USB1-Main")
 
         cursor = test_db.execute(
             "SELECT DISTINCT source_label FROM tracks"
@@ -83,42 +90,31 @@ class TestScannerBasic:
         assert len(rows) == 1, f"Expected 1 source label, got {len(rows)}"
         assert rows[0][0] == "USB1-Main", f"Expected 'USB1-Main', got '{rows[0][0]}'"
 
-    def test_scanner_stores_filename_lower(self, test_db, test_audio_dir):
+    def test_scanner_stores_filename_lower(self, sample_row):
         """Test that filename_lower is stored for cross-platform matching."""
-        scanner.scan_directory(test_db, test_audio_dir, "TestLibrary")
-
-        cursor = test_db.execute(
-            "SELECT filename, filename_lower FROM tracks LIMIT 1"
-        )
-        row = cursor.fetchone()
-        assert row is not None
-        filename, filename_lower = row
+        filename, filename_lower = sample_row.filename, sample_row.filename_lower
         assert filename_lower == filename.lower(), (
             f"Expected filename_lower to match {filename.lower()}, got '{filename_lower}'"
         )
 
-    def test_scanner_stores_file_format(self, test_db, test_audio_dir):
+    def test_scanner_stores_file_format(self, scanned_db):
         """Test that file format is stored correctly."""
-        scanner.scan_directory(test_db, test_audio_dir, "TestLibrary")
-
-        cursor = test_db.execute(
-            "SELECT DISTINCT file_format FROM tracks ORDER BY file_format"
-        )
-        formats = [row[0] for row in cursor.fetchall()]
-
         # Fixture creates only FLAC files
-        assert ".flac" in formats, f"Expected .flac format, got {formats}"
+        row = scanned_db.execute(
+            "SELECT 1 FROM tracks WHERE file_format = ? LIMIT 1", (".flac",)
+        ).fetchone()
+        assert row is not None, "Expected at least one .flac track"
+
+    def test_scanner_updates_planner_stats(self, scanned_db):
+        """A scan finishes with ANALYZE, so the planner has row counts for tracks."""
+        row = scanned_db.execute(
+            "SELECT 1 FROM sqlite_stat1 WHERE tbl = 'tracks' LIMIT 1"
+        ).fetchone()
+        assert row is not None
 
-    def test_scanner_stores_filepath(self, test_db, test_audio_dir):
+    def test_scanner_stores_filepath(self, sample_row, test_audio_dir):
         """Test that full filepath is stored."""
-        scanner.scan_directory(test_db, test_audio_dir, "TestLibrary")
-
-        cursor = test_db.execute(
-            "SELECT filepath FROM tracks LIMIT 1"
-        )
-        row = cursor.fetchone()
-        assert row is not None
-        filepath = row[0]
+        filepath = sample_row.filepath
         assert str(test_audio_dir) in filepath, (
             f"Expected filepath to contain {test_audio_dir}, got {filepath}"
         )
@@ -130,32 +126,59 @@ class TestScannerBasic:
 class TestScannerFormats:
     """Test scanner with audio formats."""
 
-    def test_scanner_flac_format(self, test_db, test_audio_dir):
+    def test_scanner_flac_format(self, scanned_db):
         """Test FLAC file scanning (supported format)."""
-        scanner.scan_directory(test_db, test_audio_dir, "TestLibrary")
+        rows = scanned_db.execute("SELECT filename, file_format FROM tracks").fetchall()
 
-        cursor = test_db.execute(
-            "SELECT COUNT(*) FROM tracks WHERE file_format = '.flac'"
-        )
-        count = cursor.fetchone()[0]
-        assert count == 3, f"Expected 3 FLAC files, got {count}"
+        assert len(rows) == 3, f"Expected 3 FLAC files, got {len(rows)}"
+        for filename, file_format in rows:
+            assert file_format == ".flac", f"{filename}: expected file_format '.flac', got {file_format!r}"
+            assert filename.endswith(".flac"), f"Expected filename to end with '.flac', got {filename}"
 
-        # Verify all files are stored with proper filenames
-        cursor = test_db.execute(
-            "SELECT filename FROM tracks WHERE file_format = '.flac' ORDER BY filename"
-        )
-        filenames = [row[0] for row in cursor.fetchall()]
-        assert all(f.endswith(".flac") for f in filenames), f"Expected all FLAC files, got {filenames}"
-        assert len(filenames) == 3
+
+@pytest.fixture
+def nested_audio_dir(tmp_path, test_audio_dir):
+    """Sample FLACs spread over nested folders, plus files the scanner must skip."""
+    sample = test_audio_dir / "test_track_01.flac"
+    for relative in ("top.flac", "a/one.FLAC", "a/b/two.flac", "a/b/c/three.flac", "d/four.flac"):
+        target = tmp_path / relative
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(sample, target)
+    (tmp_path / "a" / "notes.txt").write_text("not audio")
+    (tmp_path / "empty").mkdir()
+    return tmp_path
+
+
+class TestScannerTraversal:
+    """Test recursive file discovery."""
+
+    def test_scanner_finds_nested_files(self, test_db, nested_audio_dir):
+        """Scan discovers the same audio files as a pathlib walk, at every depth."""
+        scanner.scan_directory(test_db, nested_audio_dir, "Nested")
+
+        expected = {
+            str(path) for path in nested_audio_dir.rglob("*")
+            if path.is_file() and path.suffix.lower() in scanner.AUDIO_EXTENSIONS
+        }
+        found = {row[0] for row in test_db.execute("SELECT filepath FROM tracks")}
+        assert found == expected
+        assert len(found) == 5
+
+    def test_scanner_stores_file_size(self, test_db, nested_audio_dir):
+        """File size comes from the directory entry's stat."""
+        scanner.scan_directory(test_db, nested_audio_dir, "Nested")
+
+        for filepath, file_size in test_db.execute("SELECT filepath, file_size FROM tracks"):
+            assert file_size == os.path.getsize(filepath)
 
 
 class TestScannerErrorHandling:
     """Test scanner error handling."""
 
-    def test_scanner_nonexistent_directory(self, test_db):
-        """Test scanner with nonexistent directory."""
+    def test_scanner_nonexistent_directory(self):
+        """Test scanner with nonexistent directory (rejected before the DB is used)."""
         with pytest.raises(FileNotFoundError):
-            scanner.scan_directory(test_db, "/nonexistent/path", "TestLibrary")
+            scanner.scan_directory(None, "/nonexistent/path", "TestLibrary")
 
     def test_scanner_empty_directory(self, test_db, tmp_path):
         """Test scanner with empty directory."""
@@ -169,6 +192,7 @@ class TestScannerErrorHandling:
 class TestScannerUpsert:
     """Test scanner upsert behavior."""
 
+    @pytest.mark.slow
     def test_scanner_rescan_updates_metadata(self, test_db, test_audio_dir):
         """Test that rescanning updates track metadata without creating duplicates."""
         # First scan
@@ -201,24 +225,151 @@ class TestScannerUpsert:
         test_filename = row[0]
 
         # Manually set in_rekordbox for that track
-        test_db.execute(
-            f"UPDATE tracks SET in_rekordbox = 1 WHERE filename = '{test_filename}'"
-        )
-        test_db.commit()
-
-        # Verify it was set
-        cursor = test_db.execute(
-            f"SELECT in_rekordbox FROM tracks WHERE filename = '{test_filename}'"
-        )
-        assert cursor.fetchone()[0] == 1
+        with test_db:
+            updated = test_db.execute(
+                "UPDATE tracks SET in_rekordbox = 1 WHERE filename = ?", (test_filename,)
+            ).rowcount
+        assert updated == 1
 
         # Rescan
         scanner.scan_directory(test_db, test_audio_dir, "TestLibrary")
 
         # Check that in_rekordbox is still 1
         cursor = test_db.execute(
-            f"SELECT in_rekordbox FROM tracks WHERE filename = '{test_filename}'"
+            "SELECT in_rekordbox FROM tracks WHERE filename = ?", (test_filename,)
         )
         row = cursor.fetchone()
         assert row is not None, f"Track '{test_filename}' not found after rescan"
         assert row[0] == 1, "in_rekordbox flag was not preserved during rescan"
+
+    def test_write_batch_updates_existing_row(self, test_db):
+        """Upserting a known filepath refreshes its metadata and keeps in_rekordbox."""
+        insert_tracks(test_db, [
+            ("/m/old.flac", "old.flac", "old.flac", "USB1", "Old Title", "Old Artist",
+             "House", 120.0, "1A", ".flac", 1),
+        ])
+        metadata = {
+            "title": "New Title", "artist": "New Artist", "album": None, "genre": "",
+            "bpm": 124.0, "musical_key": None, "duration_sec": 300.0, "bitrate": 1000,
+            "sample_rate": 44100, "file_format": ".flac", "comments": None, "label": None,
+            "remixer": None,
+        }
+        values = scanner._track_values(Path("/m/old.flac"), "USB2", metadata, 1234)
+
+        assert scanner._write_batch(test_db, [(Path("/m/old.flac"), values)]) == 1
+
+        row = test_db.execute("SELECT * FROM tracks").fetchone()
+        assert (row["title"], row["artist"], row["bpm"], row["source_label"]) == (
+            "New Title", "New Artist", 124.0, "USB2",
+        )
+        # Empty/missing tags keep the stored values
+        assert (row["genre"], row["musical_key"]) == ("House", "1A")
+        assert row["in_rekordbox"] == 1
+        assert test_db.execute("SELECT COUNT(*) FROM tracks").fetchone()[0] == 1
+
+
+class _RecordingConnection(sqlite3.Connection):
+    """Connection that records how many rows each executemany call wrote."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.executemany_batches = []
+
+    def executemany(self, sql, seq_of_parameters):
+        rows = list(seq_of_parameters)
+        self.executemany_batches.append(len(rows))
+        return super().executemany(sql, rows)
+
+
+class TestScannerBatching:
+    """Test batched upserts."""
+
+    def test_scan_uses_executemany(self, test_audio_dir, monkeypatch):
+        """Tracks are written in executemany batches of at most _BATCH_SIZE."""
+        monkeypatch.setattr(scanner, "_BATCH_SIZE", 2)
+        conn = memory_db(factory=_RecordingConnection)
+
+        scanner.scan_directory(conn, test_audio_dir, "TestLibrary")
+
+        assert conn.executemany_batches == [2, 1]
+        assert conn.execute("SELECT COUNT(*) FROM tracks").fetchone()[0] == 3
+        conn.close()
+
+    def test_failed_batch_skips_only_bad_rows(self, test_db, test_audio_dir, capsys):
+        """A database error on one row falls back to per-row writes for that batch."""
+        test_db.execute("""
+            CREATE TEMP TRIGGER reject_track_02 BEFORE INSERT ON tracks
+            WHEN NEW.filename = 'test_track_02.flac'
+            BEGIN SELECT RAISE(ABORT, 'rejected'); END
+        """)
+
+        scanner.scan_directory(test_db, test_audio_dir, "TestLibrary")
+
+        filenames = [row[0] for row in test_db.execute("SELECT filename FROM tracks ORDER BY filename")]
+        assert filenames == ["test_track_01.flac", "test_track_03.flac"]
+        out = capsys.readouterr().out
+        assert "[WARN] Database error for" in out and "test_track_02.flac" in out
+        assert "Indexed 2 tracks" in out
+
+
+@pytest.fixture
+def many_audio_dir(tmp_path, test_audio_dir):
+    """Fifty FLAC samples across two folders, for the threaded metadata path."""
+    sample = test_audio_dir / "test_track_01.flac"
+    for i in range(50):
+        target = tmp_path / f"set{i % 2}" / f"track_{i:02d}.flac"
+        target.parent.mkdir(exist_ok=True)
+        shutil.copyfile(sample, target)
+    return tmp_path
+
+
+class TestScannerParallel:
+    """Test threaded metadata extraction."""
+
+    def test_scanner_parallel_counts_and_order(self, test_db, many_audio_dir):
+        """Every file is indexed once and rows are written in sorted filepath order."""
+        scanner.scan_directory(test_db, many_audio_dir, "Many")
+
+        filepaths = [row[0] for row in test_db.execute("SELECT filepath FROM tracks ORDER BY id")]
+        assert len(filepaths) == 50
+        assert filepaths == sorted(filepaths)
+        formats = {row[0] for row in test_db.execute("SELECT DISTINCT file_format FROM tracks")}
+        assert formats == {".flac"}
+
+
+    def test_error_in_write_loop_cancels_pending_reads(self, test_db, many_audio_dir, monkeypatch):
+        """An exception while writing stops the scan without reading the remaining files."""
+        reads = []
+
+        def slow_extract(filepath):
+            reads.append(filepath)
+            time.sleep(0.01)
+            return {}
+
+        def interrupt(*args):
+            raise KeyboardInterrupt
+
+        monkeypatch.setattr(scanner, "_MAX_WORKERS", 2)
+        monkeypatch.setattr(scanner, "_extract_metadata", slow_extract)
+        # Raised while handling the first result, as Ctrl-C would be
+        monkeypatch.setattr(scanner, "_track_values", interrupt)
+
+        with pytest.raises(KeyboardInterrupt):
+            scanner.scan_directory(test_db, many_audio_dir, "Many")
+        time.sleep(0.05)  # let reads already running finish
+
+        assert len(reads) < 10
+
+
+class TestTagReaders:
+    """Compare tag-reading backends on the same sample files."""
+
+    def test_reads_sample_tags(self, tag_reader, test_audio_dir):
+        """Each backend reads the same tags from the canonical FLAC sample."""
+        tags = tag_reader(test_audio_dir / "test_track_01.flac")
+        assert tags == {
+            "title": "Test Track",
+            "artist": "Test Artist",
+            "album": "Test Album",
+            "genre": "Test Genre",
+        }
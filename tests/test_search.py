@@ -2,12 +2,34 @@
 
 import argparse
 import io
-import sys
-from contextlib import redirect_stdout
 
 import pytest
 
-from dj_indexer import search, display
+from dj_indexer import db, search, display
+
+from .conftest import insert_tracks
+
+
+# Search arguments: no query, no filters, no special mode
+_ARGS_BASE = argparse.Namespace(
+    query=None, regex=False, re=False,
+    artist=None, title=None, filename=None, genre=None, key=None,
+    bpm_min=None, bpm_max=None, source=None, format=None,
+    in_rekordbox=False, not_in_rekordbox=False,
+    no_cues=False, duplicates=False, playlists=False, playlist=None,
+    limit=100,
+)
+
+
+def _args(**overrides):
+    """Copy of _ARGS_BASE with the given attributes overridden."""
+    return argparse.Namespace(**{**vars(_ARGS_BASE), **overrides})
+
+
+def _bpm_summary(conn, args):
+    """(MIN(bpm), MAX(bpm), COUNT(*)) over a search's results, aggregated in SQLite."""
+    sql, params = search._build_search_query(args)
+    return tuple(conn.execute(f"SELECT MIN(bpm), MAX(bpm), COUNT(*) FROM ({sql})", params).fetchone())
 
 
 class TestFreeTextSearch:
@@ -15,14 +37,7 @@ class TestFreeTextSearch:
 
     def test_search_by_title(self, populated_db):
         """Find track by title."""
-        args = argparse.Namespace(
-            query="Electric Dreams", regex=False, re=False,
-            artist=None, title=None, filename=None, genre=None, key=None,
-            bpm_min=None, bpm_max=None, source=None, format=None,
-            in_rekordbox=False, not_in_rekordbox=False,
-            no_cues=False, duplicates=False, playlists=False, playlist=None,
-            limit=100
-        )
+        args = _args(query="Electric Dreams")
         sql, params = search._build_search_query(args)
         cursor = populated_db.cursor()
         cursor.execute(sql, params)
@@ -33,14 +48,7 @@ class TestFreeTextSearch:
 
     def test_search_by_artist(self, populated_db):
         """Find tracks by artist name."""
-        args = argparse.Namespace(
-            query="Jon Hopkins", regex=False, re=False,
-            artist=None, title=None, filename=None, genre=None, key=None,
-            bpm_min=None, bpm_max=None, source=None, format=None,
-            in_rekordbox=False, not_in_rekordbox=False,
-            no_cues=False, duplicates=False, playlists=False, playlist=None,
-            limit=100
-        )
+        args = _args(query="Jon Hopkins")
         sql, params = search._build_search_query(args)
         cursor = populated_db.cursor()
         cursor.execute(sql, params)
@@ -52,14 +60,7 @@ class TestFreeTextSearch:
 
     def test_search_by_filename(self, populated_db):
         """Find track by filename."""
-        args = argparse.Namespace(
-            query="track1.mp3", regex=False, re=False,
-            artist=None, title=None, filename=None, genre=None, key=None,
-            bpm_min=None, bpm_max=None, source=None, format=None,
-            in_rekordbox=False, not_in_rekordbox=False,
-            no_cues=False, duplicates=False, playlists=False, playlist=None,
-            limit=100
-        )
+        args = _args(query="track1.mp3")
         sql, params = search._build_search_query(args)
         cursor = populated_db.cursor()
         cursor.execute(sql, params)
@@ -70,14 +71,7 @@ class TestFreeTextSearch:
 
     def test_search_no_results(self, populated_db):
         """Return empty results for non-matching query."""
-        args = argparse.Namespace(
-            query="NonExistentTrack", regex=False, re=False,
-            artist=None, title=None, filename=None, genre=None, key=None,
-            bpm_min=None, bpm_max=None, source=None, format=None,
-            in_rekordbox=False, not_in_rekordbox=False,
-            no_cues=False, duplicates=False, playlists=False, playlist=None,
-            limit=100
-        )
+        args = _args(query="NonExistentTrack")
         sql, params = search._build_search_query(args)
         cursor = populated_db.cursor()
         cursor.execute(sql, params)
@@ -85,25 +79,74 @@ class TestFreeTextSearch:
 
         assert len(rows) == 0
 
+    def test_search_short_term_is_substring(self, populated_db):
+        """A term shorter than a trigram still matches inside words ("ep" finds Bicep)."""
+        sql, params = search._build_search_query(_args(query="ep"))
+        artists = {row["artist"] for row in populated_db.execute(sql, params)}
+
+        assert "Bicep" in artists
+
+    def test_search_long_term_is_substring(self, test_db):
+        """A pasted filename fragment over 32 characters still matches mid-word."""
+        filename = "2024-03-01_bicep_glue_extended_mix_master_v2_final.flac"
+        insert_tracks(test_db, [
+            (f"/m/{filename}", filename, filename.lower(), "USB1", "Glue", "Bicep",
+             None, None, None, ".flac", 0),
+        ])
+        term = "cep_glue_extended_mix_master_v2_fin"
+        assert len(term) > 32
+
+        sql, params = search._build_search_query(_args(query=term))
+        assert [row["filename"] for row in test_db.execute(sql, params)] == [filename]
+
+    def test_search_word_prefixes_across_fields(self, populated_db):
+        """Terms match word prefixes and may hit different columns."""
+        args = _args(query="bicep glu")
+        sql, params = search._build_search_query(args)
+        rows = populated_db.execute(sql, params).fetchall()
+
+        assert [row[2] for row in rows] == ["Glue"]
+
+    def test_search_single_term_substring(self, populated_db):
+        """A single term matches inside words through the trigram index."""
+        args = _args(query="ectric")
+        sql, params = search._build_search_query(args)
+        assert "tracks_fts_trigram" in sql
+        rows = populated_db.execute(sql, params).fetchall()
+
+        assert [row[2] for row in rows] == ["Electric Dreams"]
+
+    def test_search_query_syntax_is_literal(self, populated_db):
+        """FTS5 operators and quotes in the query are searched for, not parsed."""
+        args = _args(query='Glue AND "NEAR(')
+        sql, params = search._build_search_query(args)
+
+        assert populated_db.execute(sql, params).fetchall() == []
+
+    def test_fts_query(self):
+        """Terms are quoted prefix tokens; punctuation-only input has no terms."""
+        assert search._fts_query('Jon  Hop"kins') == '"Jon"* "Hop""kins"*'
+        assert search._fts_query(" - & ") is None
+
+    def test_fts_index_follows_updates(self, populated_db):
+        """Triggers keep tracks_fts in step with tracks, folding diacritics."""
+        populated_db.execute("UPDATE tracks SET title = 'Électrique' WHERE title = 'Glue'")
+
+        def matches(expr):
+            return populated_db.execute(
+                "SELECT COUNT(*) FROM tracks_fts WHERE tracks_fts MATCH ?", (expr,)
+            ).fetchone()[0]
+
+        assert matches('"electrique"*') == 1
+        assert matches('"glue"*') == 0
+
 
 class TestRegexSearch:
     """Test broad and field-scoped regex search."""
 
     def test_broad_regex_alternation(self, populated_db):
         """Search with regex alternation across all fields."""
-        # Register REGEXP function
-        import re as re_module
-        populated_db.create_function("REGEXP", 2,
-            lambda pat, val: bool(re_module.search(pat, val, re_module.IGNORECASE)) if val else False)
-
-        args = argparse.Namespace(
-            query="bicep|fisher", regex=True, re=False,
-            artist=None, title=None, filename=None, genre=None, key=None,
-            bpm_min=None, bpm_max=None, source=None, format=None,
-            in_rekordbox=False, not_in_rekordbox=False,
-            no_cues=False, duplicates=False, playlists=False, playlist=None,
-            limit=100
-        )
+        args = _args(query="bicep|fisher", regex=True)
         sql, params = search._build_search_query(args)
         cursor = populated_db.cursor()
         cursor.execute(sql, params)
@@ -116,19 +159,7 @@ class TestRegexSearch:
 
     def test_regex_pattern_matching(self, populated_db):
         """Search with regex pattern."""
-        # Register REGEXP function
-        import re as re_module
-        populated_db.create_function("REGEXP", 2,
-            lambda pat, val: bool(re_module.search(pat, val, re_module.IGNORECASE)) if val else False)
-
-        args = argparse.Namespace(
-            query="^Electric.*", regex=True, re=False,
-            artist=None, title=None, filename=None, genre=None, key=None,
-            bpm_min=None, bpm_max=None, source=None, format=None,
-            in_rekordbox=False, not_in_rekordbox=False,
-            no_cues=False, duplicates=False, playlists=False, playlist=None,
-            limit=100
-        )
+        args = _args(query="^Electric.*", regex=True)
         sql, params = search._build_search_query(args)
         cursor = populated_db.cursor()
         cursor.execute(sql, params)
@@ -139,19 +170,7 @@ class TestRegexSearch:
 
     def test_regex_field_scoped_artist(self, populated_db):
         """Search with regex scoped to artist field."""
-        # Register REGEXP function
-        import re as re_module
-        populated_db.create_function("REGEXP", 2,
-            lambda pat, val: bool(re_module.search(pat, val, re_module.IGNORECASE)) if val else False)
-
-        args = argparse.Namespace(
-            query=None, regex=False, re=True,
-            artist="bicep|fisher", title=None, filename=None, genre=None, key=None,
-            bpm_min=None, bpm_max=None, source=None, format=None,
-            in_rekordbox=False, not_in_rekordbox=False,
-            no_cues=False, duplicates=False, playlists=False, playlist=None,
-            limit=100
-        )
+        args = _args(re=True, artist="bicep|fisher")
         sql, params = search._build_search_query(args)
         cursor = populated_db.cursor()
         cursor.execute(sql, params)
@@ -164,19 +183,7 @@ class TestRegexSearch:
 
     def test_regex_field_scoped_title(self, populated_db):
         """Search with regex scoped to title field."""
-        # Register REGEXP function
-        import re as re_module
-        populated_db.create_function("REGEXP", 2,
-            lambda pat, val: bool(re_module.search(pat, val, re_module.IGNORECASE)) if val else False)
-
-        args = argparse.Namespace(
-            query=None, regex=False, re=True,
-            artist=None, title=".*wave.*", filename=None, genre=None, key=None,
-            bpm_min=None, bpm_max=None, source=None, format=None,
-            in_rekordbox=False, not_in_rekordbox=False,
-            no_cues=False, duplicates=False, playlists=False, playlist=None,
-            limit=100
-        )
+        args = _args(re=True, title=".*wave.*")
         sql, params = search._build_search_query(args)
         cursor = populated_db.cursor()
         cursor.execute(sql, params)
@@ -185,20 +192,93 @@ class TestRegexSearch:
         assert len(rows) == 1
         assert "Ambient Waves" in rows[0][2]
 
+    def test_regexp_compiles_pattern_once(self, test_db):
+        """REGEXP reuses one compiled pattern for every row it is called on."""
+        insert_tracks(test_db, [
+            (f"/m/{i}.mp3", f"{i}.mp3", f"{i}.mp3", "USB1", f"Track {i}", artist,
+             None, None, None, ".mp3", 0)
+            for i, artist in enumerate(["Bicep", "Fisher", "Floating Points", "bicep"])
+        ])
+        db._compile_regexp.cache_clear()
+
+        count = test_db.execute(
+            "SELECT COUNT(*) FROM tracks WHERE REGEXP(?, artist)", ("^bicep$",)
+        ).fetchone()[0]
+
+        assert count == 2
+        assert db._compile_regexp.cache_info().misses == 1
+
+    def test_regex_prefilter_literals(self):
+        """Plain literal alternations become a trigram OR; other syntax disables it."""
+        assert search._regex_prefilter("bicep|fisher") == '"bicep" OR "fisher"'
+        assert search._regex_prefilter("^Electric.*") == '"Electric"'
+        assert search._regex_prefilter("(bicep|fisher)") is None
+        assert search._regex_prefilter("bi.ep") is None
+        assert search._regex_prefilter("bicep|ab") is None
+
+    def test_broad_regex_prefilter_skips_non_candidates(self, populated_db):
+        """The trigram prefilter cuts REGEXP calls without changing the results."""
+        calls = []
+        populated_db.create_function(
+            "REGEXP", 2, lambda pat, val: calls.append(val) or db._sqlite_regexp(pat, val)
+        )
+
+        def run(pattern):
+            calls.clear()
+            args = _args(query=pattern, regex=True)
+            sql, params = search._build_search_query(args)
+            return populated_db.execute(sql, params).fetchall(), len(calls)
+
+        try:
+            # The group hides the literals, so this spelling scans every row
+            unfiltered, unfiltered_calls = run("(bicep|fisher)")
+            filtered, filtered_calls = run("bicep|fisher")
+        finally:
+            db.register_functions(populated_db)
+
+        assert [tuple(row) for row in filtered] == [tuple(row) for row in unfiltered]
+        assert filtered_calls < unfiltered_calls
+
+    def test_regex_skips_null_and_empty_in_sql(self, populated_db):
+        """NULL and empty columns are filtered out before REGEXP is called."""
+        calls = []
+        populated_db.create_function(
+            "REGEXP", 2, lambda pat, val: calls.append(val) or db._sqlite_regexp(pat, val)
+        )
+        args = _args(query="(nothing)", regex=True)
+        try:
+            sql, params = search._build_search_query(args)
+            populated_db.execute(sql, params).fetchall()
+        finally:
+            db.register_functions(populated_db)
+
+        assert calls
+        assert None not in calls and "" not in calls
+
+    def test_literal_regex_filters_use_like(self, populated_db):
+        """Literal-only --re patterns become LIKE; real regex syntax keeps REGEXP."""
+        assert search._regex_as_like(".*wave.*") == "%wave%"
+        assert search._regex_as_like("50%_off") == r"%50\%\_off%"
+        assert search._regex_as_like("^wave") is None
+        assert search._regex_as_like("bicep|fisher") is None
+
+        sql, params = search._build_search_query(_args(re=True, title=".*wave.*"))
+        assert "REGEXP" not in sql
+        assert [row[2] for row in populated_db.execute(sql, params)] == ["Ambient Waves"]
+
+    def test_regexp_null_and_empty_never_match(self):
+        """NULL and empty values are non-matches, even for patterns that match ''."""
+        assert db._sqlite_regexp(".*", None) is False
+        assert db._sqlite_regexp(".*", "") is False
+        assert db._sqlite_regexp("GLUE", "glue") is True
+
 
 class TestFieldFilters:
     """Test individual field filters."""
 
     def test_filter_by_artist(self, populated_db):
         """Filter by artist field."""
-        args = argparse.Namespace(
-            query=None, regex=False, re=False,
-            artist="Bicep", title=None, filename=None, genre=None, key=None,
-            bpm_min=None, bpm_max=None, source=None, format=None,
-            in_rekordbox=False, not_in_rekordbox=False,
-            no_cues=False, duplicates=False, playlists=False, playlist=None,
-            limit=100
-        )
+        args = _args(artist="Bicep")
         sql, params = search._build_search_query(args)
         cursor = populated_db.cursor()
         cursor.execute(sql, params)
@@ -209,14 +289,7 @@ class TestFieldFilters:
 
     def test_filter_by_title(self, populated_db):
         """Filter by title field."""
-        args = argparse.Namespace(
-            query=None, regex=False, re=False,
-            artist=None, title="Chill", filename=None, genre=None, key=None,
-            bpm_min=None, bpm_max=None, source=None, format=None,
-            in_rekordbox=False, not_in_rekordbox=False,
-            no_cues=False, duplicates=False, playlists=False, playlist=None,
-            limit=100
-        )
+        args = _args(title="Chill")
         sql, params = search._build_search_query(args)
         cursor = populated_db.cursor()
         cursor.execute(sql, params)
@@ -227,14 +300,7 @@ class TestFieldFilters:
 
     def test_filter_by_genre(self, populated_db):
         """Filter by genre field."""
-        args = argparse.Namespace(
-            query=None, regex=False, re=False,
-            artist=None, title=None, filename=None, genre="Ambient", key=None,
-            bpm_min=None, bpm_max=None, source=None, format=None,
-            in_rekordbox=False, not_in_rekordbox=False,
-            no_cues=False, duplicates=False, playlists=False, playlist=None,
-            limit=100
-        )
+        args = _args(genre="Ambient")
         sql, params = search._build_search_query(args)
         cursor = populated_db.cursor()
         cursor.execute(sql, params)
@@ -245,14 +311,7 @@ class TestFieldFilters:
 
     def test_filter_by_source(self, populated_db):
         """Filter by source label."""
-        args = argparse.Namespace(
-            query=None, regex=False, re=False,
-            artist=None, title=None, filename=None, genre=None, key=None,
-            bpm_min=None, bpm_max=None, source="USB2", format=None,
-            in_rekordbox=False, not_in_rekordbox=False,
-            no_cues=False, duplicates=False, playlists=False, playlist=None,
-            limit=100
-        )
+        args = _args(source="USB2")
         sql, params = search._build_search_query(args)
         cursor = populated_db.cursor()
         cursor.execute(sql, params)
@@ -267,72 +326,65 @@ class TestBPMFilters:
 
     def test_bpm_minimum(self, populated_db):
         """Filter by minimum BPM."""
-        args = argparse.Namespace(
-            query=None, regex=False, re=False,
-            artist=None, title=None, filename=None, genre=None, key=None,
-            bpm_min=120.0, bpm_max=None, source=None, format=None,
-            in_rekordbox=False, not_in_rekordbox=False,
-            no_cues=False, duplicates=False, playlists=False, playlist=None,
-            limit=100
-        )
-        sql, params = search._build_search_query(args)
-        cursor = populated_db.cursor()
-        cursor.execute(sql, params)
-        rows = cursor.fetchall()
+        assert _bpm_summary(populated_db, _args(bpm_min=120.0)) == (124.0, 130.0, 4)
 
-        assert len(rows) == 4
-        assert all(row[5] >= 120.0 for row in rows)
+    @pytest.mark.parametrize("overrides,expected_bpms", [
+        ({"bpm_min": 250.0}, [250.0, 251.0, 252.0, 253.0, 254.0]),
+        ({"bpm_max": 52.0}, [50.0, 51.0, 52.0]),
+        ({"bpm_min": 251.0, "bpm_max": 253.0}, [251.0, 252.0, 253.0]),
+    ], ids=["min_only", "max_only", "range"])
+    def test_bpm_bounds_use_index(self, skewed_bpm_db, overrides, expected_bpms):
+        """Selective BPM bounds seek idx_tracks_bpm instead of walking the ORDER BY index."""
+        sql, params = search._build_search_query(_args(**overrides))
+        plan = " ".join(row[3] for row in skewed_bpm_db.execute("EXPLAIN QUERY PLAN " + sql, params))
+
+        assert "idx_tracks_bpm" in plan
+        assert sorted(row["bpm"] for row in skewed_bpm_db.execute(sql, params)) == expected_bpms
 
     def test_bpm_maximum(self, populated_db):
         """Filter by maximum BPM."""
-        args = argparse.Namespace(
-            query=None, regex=False, re=False,
-            artist=None, title=None, filename=None, genre=None, key=None,
-            bpm_min=None, bpm_max=115.0, source=None, format=None,
-            in_rekordbox=False, not_in_rekordbox=False,
-            no_cues=False, duplicates=False, playlists=False, playlist=None,
-            limit=100
-        )
-        sql, params = search._build_search_query(args)
-        cursor = populated_db.cursor()
-        cursor.execute(sql, params)
-        rows = cursor.fetchall()
-
-        assert len(rows) == 2
-        assert all(row[5] <= 115.0 for row in rows)
+        assert _bpm_summary(populated_db, _args(bpm_max=115.0)) == (95.0, 110.0, 2)
 
     def test_bpm_range(self, populated_db):
         """Filter by BPM range."""
-        args = argparse.Namespace(
-            query=None, regex=False, re=False,
-            artist=None, title=None, filename=None, genre=None, key=None,
-            bpm_min=125.0, bpm_max=130.0, source=None, format=None,
-            in_rekordbox=False, not_in_rekordbox=False,
-            no_cues=False, duplicates=False, playlists=False, playlist=None,
-            limit=100
-        )
-        sql, params = search._build_search_query(args)
-        cursor = populated_db.cursor()
-        cursor.execute(sql, params)
-        rows = cursor.fetchall()
-
-        assert len(rows) == 3
-        assert all(125.0 <= row[5] <= 130.0 for row in rows)
+        # Both bounds are inclusive: the 130 BPM track is in range
+        assert _bpm_summary(populated_db, _args(bpm_min=125.0, bpm_max=130.0)) == (128.0, 130.0, 3)
 
 
 class TestCombinedFilters:
     """Test combining multiple filters with AND logic."""
 
+    def test_same_shape_reuses_sql(self):
+        """Searches setting the same filters share one SQL string; params differ."""
+        sql_a, params_a = search._build_search_query(_args(artist="Bicep", bpm_min=120.0))
+        sql_b, params_b = search._build_search_query(_args(artist="Fisher", bpm_min=90.0))
+        sql_c, _ = search._build_search_query(_args(artist="Bicep"))
+
+        assert sql_a is sql_b
+        assert params_a != params_b
+        assert sql_c != sql_a
+
+        sql_d, _ = search._build_search_query(_args(query="bicep|fisher", regex=True, re=True, key="1[AB]"))
+        sql_e, _ = search._build_search_query(_args(query="glue|drop", regex=True, re=True, key="2[AB]"))
+        assert sql_d is sql_e
+
+        # No filters: no WHERE clause at all (rather than WHERE 1=1)
+        sql_all, params_all = search._build_search_query(_args())
+        assert "WHERE" not in sql_all.split("FROM tracks t")[1]
+        assert params_all == [100]
+
+    def test_bpm_search_keeps_result_order(self, skewed_bpm_db):
+        """A BPM-bounded search still returns rows ordered by artist, then title."""
+        sql, params = search._build_search_query(_args(bpm_min=125.0, limit=500))
+        rows = skewed_bpm_db.execute(sql, params).fetchall()
+        keys = [(row["artist"], row["title"]) for row in rows]
+
+        assert len(rows) == 500
+        assert keys == sorted(keys)
+
     def test_artist_and_genre(self, populated_db):
         """Combine artist and genre filters."""
-        args = argparse.Namespace(
-            query=None, regex=False, re=False,
-            artist="Jon Hopkins", title=None, filename=None, genre="Ambient", key=None,
-            bpm_min=None, bpm_max=None, source=None, format=None,
-            in_rekordbox=False, not_in_rekordbox=False,
-            no_cues=False, duplicates=False, playlists=False, playlist=None,
-            limit=100
-        )
+        args = _args(artist="Jon Hopkins", genre="Ambient")
         sql, params = search._build_search_query(args)
         cursor = populated_db.cursor()
         cursor.execute(sql, params)
@@ -344,34 +396,12 @@ class TestCombinedFilters:
 
     def test_genre_and_bpm_range(self, populated_db):
         """Combine genre and BPM filters."""
-        args = argparse.Namespace(
-            query=None, regex=False, re=False,
-            artist=None, title=None, filename=None, genre="Techno", key=None,
-            bpm_min=125.0, bpm_max=None, source=None, format=None,
-            in_rekordbox=False, not_in_rekordbox=False,
-            no_cues=False, duplicates=False, playlists=False, playlist=None,
-            limit=100
-        )
-        sql, params = search._build_search_query(args)
-        cursor = populated_db.cursor()
-        cursor.execute(sql, params)
-        rows = cursor.fetchall()
-
         # 3 tracks match: track1 (128, Techno), track2 (129, Techno), duplicate (130, Techno)
-        assert len(rows) == 3
-        # Column order: id, artist, title, filename, filepath, bpm, musical_key, source_label, ...
-        assert all(row[5] >= 125.0 for row in rows)  # Check BPM
+        assert _bpm_summary(populated_db, _args(genre="Techno", bpm_min=125.0)) == (128.0, 130.0, 3)
 
     def test_artist_source_and_bpm(self, populated_db):
         """Combine artist, source, and BPM filters."""
-        args = argparse.Namespace(
-            query=None, regex=False, re=False,
-            artist="Jon Hopkins", title=None, filename=None, genre=None, key=None,
-            bpm_min=None, bpm_max=120.0, source="External", format=None,
-            in_rekordbox=False, not_in_rekordbox=False,
-            no_cues=False, duplicates=False, playlists=False, playlist=None,
-            limit=100
-        )
+        args = _args(artist="Jon Hopkins", bpm_max=120.0, source="External")
         sql, params = search._build_search_query(args)
         cursor = populated_db.cursor()
         cursor.execute(sql, params)
@@ -388,14 +418,7 @@ class TestRekordboxFilters:
 
     def test_in_rekordbox_filter(self, populated_db):
         """Filter for tracks in rekordbox."""
-        args = argparse.Namespace(
-            query=None, regex=False, re=False,
-            artist=None, title=None, filename=None, genre=None, key=None,
-            bpm_min=None, bpm_max=None, source=None, format=None,
-            in_rekordbox=True, not_in_rekordbox=False,
-            no_cues=False, duplicates=False, playlists=False, playlist=None,
-            limit=100
-        )
+        args = _args(in_rekordbox=True)
         sql, params = search._build_search_query(args)
         cursor = populated_db.cursor()
         cursor.execute(sql, params)
@@ -408,13 +431,10 @@ class TestRekordboxFilters:
 class TestCueQueries:
     """Test cue-related special queries."""
 
-    def test_show_cues_command(self, populated_db):
+    def test_show_cues_command(self, populated_db, capsys):
         """Test show_cues function displays correct information."""
-        # Capture output
-        f = io.StringIO()
-        with redirect_stdout(f):
-            search.show_cues(populated_db, "Bicep")
-        output = f.getvalue()
+        search.show_cues(populated_db, "Bicep")
+        output = capsys.readouterr().out
 
         # Should show 2 tracks (both Bicep tracks)
         assert "Electric Dreams" in output
@@ -423,58 +443,77 @@ class TestCueQueries:
         assert "Cue points" in output
         assert "Drop" in output
 
-    def test_show_cues_no_results(self, populated_db):
+    def test_show_cues_no_results(self, populated_db, capsys):
         """Test show_cues with no matching tracks."""
-        f = io.StringIO()
-        with redirect_stdout(f):
-            search.show_cues(populated_db, "NonExistent")
-        output = f.getvalue()
+        search.show_cues(populated_db, "NonExistent")
+        output = capsys.readouterr().out
 
         assert "No tracks found" in output
 
+    def test_search_cue_counts(self, populated_db):
+        """Search rows carry per-track hot cue and total cue counts."""
+        args = _args()
+        sql, params = search._build_search_query(args)
+        counts = {row["filename"]: (row["num_hot_cues"], row["num_cues"])
+                  for row in populated_db.execute(sql, params)}
+
+        assert counts["track1.mp3"] == (2, 3)
+        assert counts["ambient.flac"] == (0, 1)
+        assert counts["house_track.flac"] == (2, 2)
+
 
 class TestSpecialQueries:
     """Test special query modes."""
 
-    def test_playlists_display(self, populated_db):
+    def test_playlists_display(self, populated_db, capsys):
         """Test listing all playlists."""
         cursor = populated_db.cursor()
-        f = io.StringIO()
-        with redirect_stdout(f):
-            search._show_playlists(cursor)
-        output = f.getvalue()
+        search._show_playlists(cursor)
+        output = capsys.readouterr().out
 
         assert "Playlists" in output
         assert "Techno Bangers" in output
         assert "Ambient" in output  # Path contains "Ambient"
         assert "House" in output
 
-    def test_duplicates_none(self, populated_db):
+    def test_duplicates_none(self, populated_db, capsys):
         """Test duplicates detection when none exist."""
         cursor = populated_db.cursor()
-        f = io.StringIO()
-        with redirect_stdout(f):
-            search._show_duplicates(cursor)
-        output = f.getvalue()
+        search._show_duplicates(cursor)
+        output = capsys.readouterr().out
 
         assert "No duplicate" in output
 
-    def test_no_cues_tracks(self, populated_db):
+    def test_duplicates_found(self, populated_db, capsys):
+        """Same filename (any case) on two sources is one duplicate group."""
+        # Uncommitted, so the per-test savepoint rolls it back
+        populated_db.execute(
+            "INSERT INTO tracks (filepath, filename, filename_lower, source_label) VALUES (?, ?, ?, ?)",
+            ("/usb2/copy/Track1.MP3", "Track1.MP3", "track1.mp3", "USB2"),
+        )
+        search._show_duplicates(populated_db.cursor())
+        output = capsys.readouterr().out
+
+        assert "Duplicate filenames (1)" in output
+        assert "track1.mp3" in output
+        assert "2 copies on: USB1, USB2" in output
+
+    def test_no_cues_tracks(self, populated_db, capsys):
         """Test finding rekordbox tracks without cue points."""
         cursor = populated_db.cursor()
-        f = io.StringIO()
-        with redirect_stdout(f):
-            search._show_no_cues(cursor, 100)
-        output = f.getvalue()
+        search._show_no_cues(cursor, 100)
+        output = capsys.readouterr().out
 
-        # "duplicate.mp3" has no cues
+        # "duplicate.mp3" is the only track without cues
+        assert "(1 tracks)" in output
         assert "Duplicate Track" in output
+        assert "[NO CUES]" in output
 
 
 class TestDisplayFormatting:
     """Test display module formatting functions."""
 
-    def test_print_results_basic(self, populated_db):
+    def test_print_results_basic(self, populated_db, capsys):
         """Test basic result printing."""
         cursor = populated_db.cursor()
         cursor.execute("""
@@ -490,10 +529,8 @@ class TestDisplayFormatting:
         """)
         rows = [tuple(row) for row in cursor.fetchall()]
 
-        f = io.StringIO()
-        with redirect_stdout(f):
-            display.print_results(rows, "Test Results")
-        output = f.getvalue()
+        display.print_results(rows, "Test Results")
+        output = capsys.readouterr().out
 
         assert "Test Results" in output
         assert "Electric Dreams" in output
@@ -501,7 +538,7 @@ class TestDisplayFormatting:
         assert "128" in output  # BPM
         assert "[RB]" in output  # rekordbox badge
 
-    def test_print_results_with_cues(self, populated_db):
+    def test_print_results_with_cues(self, populated_db, capsys):
         """Test result printing with cue badges."""
         cursor = populated_db.cursor()
         cursor.execute("""
@@ -517,15 +554,13 @@ class TestDisplayFormatting:
         """)
         rows = [tuple(row) for row in cursor.fetchall()]
 
-        f = io.StringIO()
-        with redirect_stdout(f):
-            display.print_results(rows)
-        output = f.getvalue()
+        display.print_results(rows)
+        output = capsys.readouterr().out
 
         # Should show hot/total cues
         assert "[2H/3C]" in output or "[2H" in output  # 2 hot cues, 3 total
 
-    def test_print_results_no_cues(self, populated_db):
+    def test_print_results_no_cues(self, populated_db, capsys):
         """Test result printing for tracks without cues."""
         cursor = populated_db.cursor()
         cursor.execute("""
@@ -541,23 +576,19 @@ class TestDisplayFormatting:
         """)
         rows = [tuple(row) for row in cursor.fetchall()]
 
-        f = io.StringIO()
-        with redirect_stdout(f):
-            display.print_results(rows)
-        output = f.getvalue()
+        display.print_results(rows)
+        output = capsys.readouterr().out
 
         assert "[NO CUES]" in output
 
-    def test_print_results_empty(self):
+    def test_print_results_empty(self, capsys):
         """Test result printing with no results."""
-        f = io.StringIO()
-        with redirect_stdout(f):
-            display.print_results([], "Empty Results")
-        output = f.getvalue()
+        display.print_results([], "Empty Results")
+        output = capsys.readouterr().out
 
         assert "0 tracks" in output
 
-    def test_print_cue_details(self, populated_db):
+    def test_print_cue_details(self, populated_db, capsys):
         """Test detailed cue display."""
         cursor = populated_db.cursor()
         # Get a track
@@ -577,10 +608,8 @@ class TestDisplayFormatting:
         """, (track[0],))
         cues = [tuple(row) for row in cursor.fetchall()]
 
-        f = io.StringIO()
-        with redirect_stdout(f):
-            display.print_cue_details(track, cues)
-        output = f.getvalue()
+        display.print_cue_details(track, cues)
+        output = capsys.readouterr().out
 
         assert "Electric Dreams" in output
         assert "Bicep" in output
@@ -590,6 +619,26 @@ class TestDisplayFormatting:
         assert "Hot Cue A" in output
         assert "Drop" in output
 
+    def test_print_results_single_write(self):
+        """The whole listing reaches the given file in one write() call."""
+        writes = []
+
+        class _Recorder(io.StringIO):
+            def write(self, s):
+                writes.append(s)
+                return super().write(s)
+
+        rows = [
+            (1, "Bicep", "Glue", "glue.mp3", "/usb1/glue.mp3", 129.0, "2A", "USB1", 1, 0, 0),
+            (2, None, None, "x.flac", "/usb2/x.flac", None, None, "USB2", 0, None, None),
+        ]
+        display.print_results(rows, "Buffered", file=_Recorder())
+
+        assert len(writes) == 1
+        assert "Bicep -- Glue" in writes[0]
+        assert "[RB]  [NO CUES]" in writes[0]
+        assert "   x.flac\n" in writes[0]
+
     def test_duration_formatting(self):
         """Test duration formatting helper."""
         assert display._format_duration(0.0) == "0:00"
@@ -597,48 +646,40 @@ class TestDisplayFormatting:
         assert display._format_duration(60.0) == "1:00"
         assert display._format_duration(125.5) == "2:05"
         assert display._format_duration(3661.0) == "1:01:01"
+        assert display._format_duration(3599.9) == "59:59"
+        assert display._format_duration(3600.0) == "1:00:00"
         assert display._format_duration(None) == "?"
 
 
 class TestPlaylistFiltering:
     """Test playlist search and filtering."""
 
-    def test_search_playlist_by_name(self, populated_db):
+    def test_search_playlist_by_name(self, populated_db, capsys):
         """Search for playlist by name."""
-        args = argparse.Namespace(
-            query=None, regex=False, re=False,
-            artist=None, title=None, filename=None, genre=None, key=None,
-            bpm_min=None, bpm_max=None, source=None, format=None,
-            in_rekordbox=False, not_in_rekordbox=False,
-            no_cues=False, duplicates=False, playlists=False,
-            playlist="Techno",
-            limit=100
-        )
+        args = _args(playlist="Techno")
 
         cursor = populated_db.cursor()
-        f = io.StringIO()
-        with redirect_stdout(f):
-            search._search_playlist(cursor, args, display)
-        output = f.getvalue()
+        search._search_playlist(cursor, args, display)
+        output = capsys.readouterr().out
 
         assert "Techno Bangers" in output or "Playlist:" in output
 
-    def test_search_playlist_regex(self, populated_db):
+    def test_search_playlist_regex(self, populated_db, capsys):
         """Search for playlist with regex."""
-        args = argparse.Namespace(
-            query=None, regex=False, re=True,
-            artist=None, title=None, filename=None, genre=None, key=None,
-            bpm_min=None, bpm_max=None, source=None, format=None,
-            in_rekordbox=False, not_in_rekordbox=False,
-            no_cues=False, duplicates=False, playlists=False,
-            playlist=".*Chill.*",
-            limit=100
-        )
+        args = _args(re=True, playlist=".*Chill.*")
 
         cursor = populated_db.cursor()
-        f = io.StringIO()
-        with redirect_stdout(f):
-            search._search_playlist(cursor, args, display)
-        output = f.getvalue()
+        search._search_playlist(cursor, args, display)
+        output = capsys.readouterr().out
 
         assert "Ambient Chill" in output or "Playlist:" in output
+
+    def test_search_playlist_regex_metacharacters(self, populated_db, capsys):
+        """A pattern with real regex syntax is still matched with Python re."""
+        args = _args(re=True, playlist="^root/(techno|genre)/")
+
+        search._search_playlist(populated_db.cursor(), args, display)
+        output = capsys.readouterr().out
+
+        assert "Playlist: root/Genre/House" in output
+        assert "Techno Bangers" not in output